@@ -0,0 +1,117 @@
+import time
+from json_state import load_json_state, save_json_state
+
+# Alert events returned by AlertManager.evaluate
+FIRE = "fire"
+SUSTAIN = "sustain"
+RESOLVE = "resolve"
+
+
+class AlertManager:
+    """
+    State machine turning repeated checks into a bounded number of alerts.
+
+    An alert fires once when its condition turns bad. While it stays bad it
+    is sustained with reminders, spaced by the escalation intervals, and it
+    goes quiet once they are exhausted. It resolves only when the condition
+    has recovered, which can be stricter than not being bad (hysteresis), so
+    a value hovering around a threshold doesn't flap. The firing alerts are
+    persisted, so a restart doesn't fire them again.
+    """
+
+    def __init__(self, state_path, escalation_intervals=(30 * 60, 2 * 3600, 6 * 3600)):
+        """
+        Args:
+            state_path (str): The JSON file the firing alerts are persisted to.
+            escalation_intervals (tuple, optional): The time before each reminder, in seconds. Defaults to 30 minutes, 2 hours and 6 hours.
+        """
+
+        self.state_path = state_path
+        self.escalation_intervals = escalation_intervals
+        self.firing = load_json_state(state_path, {})
+
+    def save_state(self):
+        """
+        Persist the firing alerts.
+        """
+
+        save_json_state(self.state_path, self.firing)
+
+    def evaluate(self, key, bad, recovered, value=None, now=None):
+        """
+        Advance an alert with the latest check of its condition.
+
+        Args:
+            key (str): The alert identifier.
+            bad (bool): Whether the condition is bad, firing the alert.
+            recovered (bool): Whether the condition recovered, resolving the alert.
+            value (optional): The checked value, kept with the alert state.
+            now (float, optional): The current time, as a Unix timestamp. Defaults to now.
+
+        Returns:
+            str: FIRE, SUSTAIN or RESOLVE when a message is due, otherwise None.
+        """
+
+        now = time.time() if now is None else now
+        alert = self.firing.get(key)
+
+        if alert is None:
+            if not bad:
+                return None
+            self.firing[key] = {
+                "since": now,
+                "notified_at": now,
+                "reminders": 0,
+                "value": value,
+            }
+            self.save_state()
+            return FIRE
+
+        if recovered:
+            del self.firing[key]
+            self.save_state()
+            return RESOLVE
+
+        alert["value"] = value
+        if alert["reminders"] < len(self.escalation_intervals):
+            interval = self.escalation_intervals[alert["reminders"]]
+            if now - alert["notified_at"] >= interval:
+                alert["notified_at"] = now
+                alert["reminders"] += 1
+                self.save_state()
+                return SUSTAIN
+        return None
+
+    def evaluate_below(self, key, value, trigger, clear, now=None):
+        """
+        Advance an alert on a value that must not drop below a threshold.
+
+        Args:
+            key (str): The alert identifier.
+            value (float): The checked value.
+            trigger (float): The alert fires below this value.
+            clear (float): The alert resolves at or above this value, at least `trigger`.
+            now (float, optional): The current time, as a Unix timestamp. Defaults to now.
+
+        Returns:
+            str: FIRE, SUSTAIN or RESOLVE when a message is due, otherwise None.
+        """
+
+        return self.evaluate(key, value < trigger, value >= clear, value, now)
+
+    def duration(self, key, now=None):
+        """
+        Get how long an alert has been firing.
+
+        Args:
+            key (str): The alert identifier.
+            now (float, optional): The current time, as a Unix timestamp. Defaults to now.
+
+        Returns:
+            float: The time since the alert fired, in seconds, or None if it isn't firing.
+        """
+
+        alert = self.firing.get(key)
+        if alert is None:
+            return None
+        return (time.time() if now is None else now) - alert["since"]
@@ -0,0 +1,309 @@
+import os
+import json
+import sqlite3
+import random
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from web3 import Web3, AsyncWeb3, AsyncHTTPProvider
+from log_ingestion import (
+    build_events_by_topic,
+    fetch_contract_logs,
+    decode_log,
+    is_range_error,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Contract address for DeFi Basket
+CONTRACT_ADDRESS = "0xee13C86EE4eb1EC3a05E2cc3AB70576F31666b3b"
+
+# Block the DeFi Basket history is replayed from by default
+DEFAULT_FROM_BLOCK = 46827233
+
+# Events replayed by default
+DEFAULT_EVENTS = [
+    "DEFIBASKET_CREATE",
+    "DEFIBASKET_DEPOSIT",
+    "DEFIBASKET_EDIT",
+    "DEFIBASKET_WITHDRAW",
+]
+
+# URL for Alchemy API
+ALCHEMY_URL = f'https://polygon-mainnet.g.alchemy.com/v2/{os.getenv("ALCHEMY_API_KEY")}'
+
+# Retries of a chunk failing with a transient error (throttling, timeouts)
+MAX_RETRIES = 5
+BACKOFF = 1  # seconds, doubled on every retry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    transaction_hash TEXT NOT NULL,
+    event TEXT NOT NULL,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_event ON events (event, block_number);
+CREATE TABLE IF NOT EXISTS chunks (
+    from_block INTEGER NOT NULL,
+    to_block INTEGER NOT NULL,
+    PRIMARY KEY (from_block, to_block)
+);
+"""
+
+
+class EventStore:
+    """
+    SQLite store of backfilled events, also keeping track of the block chunks
+    already scanned so an interrupted backfill resumes where it stopped.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The path of the SQLite database.
+        """
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def scanned_chunks(self):
+        """
+        Get the block chunks already scanned.
+
+        Returns:
+            set: The (from_block, to_block) of each scanned chunk.
+        """
+
+        return set(self.connection.execute("SELECT from_block, to_block FROM chunks"))
+
+    def save_chunk(self, from_block, to_block, events):
+        """
+        Store the events of a chunk and mark it as scanned, in one transaction.
+
+        Args:
+            from_block (int): The first block of the chunk.
+            to_block (int): The last block of the chunk.
+            events (list): The decoded events of the chunk.
+        """
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        event["blockNumber"],
+                        event["logIndex"],
+                        Web3.to_hex(event["transactionHash"]),
+                        event["event"],
+                        json.dumps(dict(event["args"]), default=to_json),
+                    )
+                    for event in events
+                ],
+            )
+            self.connection.execute(
+                "INSERT OR IGNORE INTO chunks VALUES (?, ?)", (from_block, to_block)
+            )
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+
+        self.connection.close()
+
+
+def to_json(value):
+    """
+    Convert the event argument types json doesn't handle.
+
+    Args:
+        value: The argument value.
+
+    Returns:
+        str: The value as a string.
+    """
+
+    if isinstance(value, bytes):
+        return Web3.to_hex(value)
+    return str(value)
+
+
+def split_chunks(from_block, to_block, chunk_size):
+    """
+    Split a block range into fixed-size chunks.
+
+    Args:
+        from_block (int): The first block of the range.
+        to_block (int): The last block of the range.
+        chunk_size (int): The number of blocks per chunk.
+
+    Returns:
+        list: The (from_block, to_block) of each chunk.
+    """
+
+    return [
+        (start, min(start + chunk_size - 1, to_block))
+        for start in range(from_block, to_block + 1, chunk_size)
+    ]
+
+
+async def scan_range(web3, contract, events_by_topic, from_block, to_block):
+    """
+    Fetch and decode the events of a block range, splitting it in halves
+    whenever the provider rejects it as too large. Other errors, like
+    throttling or timeouts, are retried with backoff on the same range.
+
+    Args:
+        web3: The AsyncWeb3 instance.
+        contract: The DeFi Basket contract.
+        events_by_topic (dict): The event objects to replay, keyed by their topic.
+        from_block (int): The first block of the range.
+        to_block (int): The last block of the range.
+
+    Returns:
+        list: The decoded events, in chain order.
+    """
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            logs = await fetch_contract_logs(
+                web3, contract.address, events_by_topic.keys(), from_block, to_block
+            )
+            break
+        except Exception as e:
+            if is_range_error(e) and from_block < to_block:
+                middle = (from_block + to_block) // 2
+                print(f"Splitting blocks {from_block}-{to_block}: {e}")
+                return await scan_range(
+                    web3, contract, events_by_topic, from_block, middle
+                ) + await scan_range(
+                    web3, contract, events_by_topic, middle + 1, to_block
+                )
+            if attempt == MAX_RETRIES:
+                raise
+            # Full jitter, so throttled workers don't retry in lockstep
+            delay = random.uniform(0, BACKOFF * 2**attempt)
+            print(f"Retrying blocks {from_block}-{to_block} in {delay:.1f}s: {e}")
+            await asyncio.sleep(delay)
+
+    events = [decode_log(events_by_topic, log) for log in logs]
+    return [event for event in events if event is not None]
+
+
+async def backfill(
+    store, web3, contract, event_names, from_block, to_block, chunk_size, concurrency
+):
+    """
+    Replay the history of some contract events into the store.
+
+    Chunks are scanned in parallel by a bounded number of workers, and the
+    chunks already in the store are skipped. If a worker fails, the others
+    are cancelled before the error propagates.
+
+    Args:
+        store (EventStore): The store the events are written to.
+        web3: The AsyncWeb3 instance.
+        contract: The DeFi Basket contract.
+        event_names (list): The names of the events to replay.
+        from_block (int): The first block to scan.
+        to_block (int): The last block to scan.
+        chunk_size (int): The number of blocks per chunk.
+        concurrency (int): The maximum number of chunks scanned at once.
+    """
+
+    events_by_topic = {
+        topic: event
+        for topic, event in build_events_by_topic(contract).items()
+        if event.event_name in event_names
+    }
+    scanned = store.scanned_chunks()
+    pending = [
+        chunk
+        for chunk in split_chunks(from_block, to_block, chunk_size)
+        if chunk not in scanned
+    ]
+    total = len(pending)
+    print(f"Scanning {total} chunks of {chunk_size} blocks, {len(scanned)} already done")
+
+    queue = asyncio.Queue()
+    for chunk in pending:
+        queue.put_nowait(chunk)
+    done = 0
+
+    async def worker():
+        nonlocal done
+        while not queue.empty():
+            chunk_from, chunk_to = queue.get_nowait()
+            events = await scan_range(
+                web3, contract, events_by_topic, chunk_from, chunk_to
+            )
+            store.save_chunk(chunk_from, chunk_to, events)
+            done += 1
+            print(f"[{done}/{total}] {chunk_from}-{chunk_to}: {len(events)} events")
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        # A failing worker stops the others before the store can be closed
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def run(args):
+    """
+    Run a backfill from the parsed command line arguments.
+
+    Args:
+        args: The parsed arguments.
+    """
+
+    with open("lib/defi_basket_abi.json") as f:
+        contract_abi = json.load(f)
+    web3 = AsyncWeb3(AsyncHTTPProvider(ALCHEMY_URL))
+    contract = web3.eth.contract(address=CONTRACT_ADDRESS, abi=contract_abi)
+    to_block = args.to_block
+    if to_block is None:
+        to_block = await web3.eth.block_number
+
+    store = EventStore(args.db)
+    try:
+        await backfill(
+            store,
+            web3,
+            contract,
+            args.events,
+            args.from_block,
+            to_block,
+            args.chunk_size,
+            args.concurrency,
+        )
+    finally:
+        store.close()
+        await web3.provider.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay DeFi Basket events into a local SQLite store."
+    )
+    parser.add_argument("--from-block", type=int, default=DEFAULT_FROM_BLOCK)
+    parser.add_argument("--to-block", type=int, help="Defaults to the latest block.")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--db", default="data/defibasket_events.sqlite")
+    parser.add_argument("--events", nargs="+", default=DEFAULT_EVENTS)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import json
+import asyncio
+from multicall import get_multicall, encode_call, decode_result, chunked
+
+# Native token (MATIC on Polygon) decimals
+NATIVE_DECIMALS = 18
+
+# How far above its minimum a low balance must get back to resolve its alert
+DEFAULT_HYSTERESIS = 0.1
+
+# Load ERC-20 ABI (balanceOf only) from local file
+with open("lib/erc20_abi.json") as f:
+    ERC20_ABI = json.load(f)
+
+
+class BalanceWatch:
+    """
+    A wallet balance that must stay at or above a minimum.
+    """
+
+    __slots__ = ("name", "wallet", "token", "min_balance", "clear_balance")
+
+    def __init__(self, name, wallet, token, min_balance, clear_balance=None):
+        """
+        Args:
+            name (str): The name of the wallet, used in alerts.
+            wallet (str): The wallet address.
+            token (Token): The ERC-20 token, or None for the native token.
+            min_balance (float): The minimum balance, in token units.
+            clear_balance (float, optional): The balance resolving a low balance alert. Defaults to DEFAULT_HYSTERESIS above the minimum.
+        """
+
+        self.name = name
+        self.wallet = wallet
+        self.token = token
+        self.min_balance = min_balance
+        self.clear_balance = (
+            clear_balance
+            if clear_balance is not None
+            else min_balance * (1 + DEFAULT_HYSTERESIS)
+        )
+
+    @property
+    def symbol(self):
+        return self.token.symbol if self.token is not None else "MATIC"
+
+    @property
+    def scale(self):
+        return self.token.scale if self.token is not None else 10**NATIVE_DECIMALS
+
+    @property
+    def key(self):
+        # Watches of the same wallet and token share a single read
+        return (self.wallet, self.token.address if self.token is not None else None)
+
+    @property
+    def alert_key(self):
+        return f"balance:{self.name}:{self.wallet}:{self.symbol}"
+
+
+def load_watches(path, registry):
+    """
+    Load the balance watches from a JSON file.
+
+    Each entry has a "name", a "wallet" address, a "token" registry key (null
+    for the native token), a "min_balance" in token units and optionally the
+    "clear_balance" resolving its alerts.
+
+    Args:
+        path (str): The path of the JSON file.
+        registry (TokenRegistry): The registry the token keys refer to.
+
+    Returns:
+        list: The balance watches.
+    """
+
+    with open(path) as f:
+        entries = json.load(f)
+    return [
+        BalanceWatch(
+            entry["name"],
+            entry["wallet"],
+            registry[entry["token"]] if entry.get("token") else None,
+            entry["min_balance"],
+            entry.get("clear_balance"),
+        )
+        for entry in entries
+    ]
+
+
+class BalanceMonitor:
+    """
+    Watches the native and ERC-20 balances of many wallets.
+
+    Every balance is read through Multicall3, so a check is one `aggregate3`
+    eth_call per `batch_size` balances, all pinned to the same block. Low
+    balances go through an AlertManager, so each one is notified when it
+    drops below its minimum, reminded while it stays low and resolved once
+    it is back above its clear balance.
+    """
+
+    def __init__(self, web3, watches, alerts, batch_size=500):
+        """
+        Args:
+            web3: The AsyncWeb3 instance.
+            watches (list): The balance watches.
+            alerts (AlertManager): The alert state machine of the low balances.
+            batch_size (int, optional): The maximum number of balances read per eth_call. Defaults to 500.
+        """
+
+        self.web3 = web3
+        self.watches = watches
+        self.alerts = alerts
+        self.batch_size = batch_size
+        self.multicall = get_multicall(web3)
+        self.tokens = {}  # ERC-20 contracts, by address
+
+    def balance_function(self, key):
+        """
+        Get the contract function reading a balance.
+
+        Args:
+            key (tuple): The wallet address and token address (None for the native token).
+
+        Returns:
+            The contract function, with its arguments bound.
+        """
+
+        wallet, token_address = key
+        if token_address is None:
+            return self.multicall.functions.getEthBalance(wallet)
+        if token_address not in self.tokens:
+            self.tokens[token_address] = self.web3.eth.contract(
+                address=token_address, abi=ERC20_ABI
+            )
+        return self.tokens[token_address].functions.balanceOf(wallet)
+
+    async def read_balances(self, block=None):
+        """
+        Read the balance of every watch.
+
+        Args:
+            block (int, optional): The block to read at. Defaults to the latest block.
+
+        Returns:
+            dict: The raw balance of each watch key, or the exception raised reading it.
+        """
+
+        if block is None:
+            block = await self.web3.eth.block_number
+        keys = list(dict.fromkeys(watch.key for watch in self.watches))
+        functions = [self.balance_function(key) for key in keys]
+        batches = chunked(functions, self.batch_size)
+        results = await asyncio.gather(
+            *[
+                self.multicall.functions.aggregate3(
+                    [encode_call(function) for function in batch]
+                ).call(block_identifier=block)
+                for batch in batches
+            ]
+        )
+
+        balances = {}
+        for key, function, result in zip(
+            keys, functions, [result for batch in results for result in batch]
+        ):
+            try:
+                balances[key] = decode_result(function, result)[0]
+            except ValueError as e:
+                balances[key] = e
+        return balances
+
+    async def check(self):
+        """
+        Read every balance and advance the low balance alerts.
+
+        Returns:
+            list: The (event, watch, balance) of each alert message due, with
+            event one of FIRE, SUSTAIN or RESOLVE and balance in token units.
+        """
+
+        balances = await self.read_balances()
+        events = []
+        for watch in self.watches:
+            balance = balances[watch.key]
+            if isinstance(balance, Exception):
+                print(
+                    f"Error occurred reading the {watch.symbol} balance of {watch.name}: {balance}"
+                )
+                continue
+            balance = balance / watch.scale
+            event = self.alerts.evaluate_below(
+                watch.alert_key, balance, watch.min_balance, watch.clear_balance
+            )
+            if event is not None:
+                events.append((event, watch, balance))
+        return events
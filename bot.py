@@ -1,20 +1,53 @@
+import time
+
+# Startup timings are measured from the first import
+STARTUP_STARTED_AT = time.perf_counter()
+
 import os
 import json
 import asyncio
+import threading
 import discord
-import requests
 import locale
-import pytz
 import psutil
 import aiohttp
-import aiohttp_retry
-from datetime import datetime
+from datetime import timedelta
 from dotenv import load_dotenv
 from discord.ext import tasks, commands
-from web3 import Web3, AsyncWeb3, AsyncHTTPProvider
 from get_portfolios_data import get_portfolio_data
+from cache import CachedFetcher
+from scheduler import DailySchedule
+from log_ingestion import LogIngestor
+from notifier import DigestNotifier
+from http_client import get_session, open_session, close_session, connection_stats
+from token_registry import registry
+from balance_monitor import BalanceMonitor, load_watches
+from alerts import AlertManager, FIRE, SUSTAIN
+
+from quoter import (
+    CachedQuoteConnector,
+    LiquidityCalculator,
+    ParaswapConnector,
+    pairs,
+    tokens,
+)
+
+# Time each startup step finished at, in seconds since STARTUP_STARTED_AT
+startup_timings = {}
+
+
+def mark_startup(step):
+    """
+    Record the time a startup step finished.
+
+    Args:
+        step (str): The step name.
+    """
+
+    startup_timings.setdefault(step, time.perf_counter() - STARTUP_STARTED_AT)
+
 
-# from quoter import LiquidityCalculator, ParaswapConnector
+mark_startup("imports")
 
 # Load environment variables
 load_dotenv()
@@ -26,13 +59,72 @@ TESULTS_TOKEN = os.getenv("TESULTS_TOKEN")
 # Channel ID for the Discord bot
 OPS_CHANNEL_ID = int(os.getenv("OPS_CHANNEL_ID"))
 
-# Contract addresses for DeFi Basket and gas station
-CONTRACT_ADDRESS = "0xee13C86EE4eb1EC3a05E2cc3AB70576F31666b3b"  # DeFi Basket
-GAS_STATION_ADDRESS = "0x6d7cFBDeb7398c00b80C5653bAFEa6dDcfA9f05d"
+# Contract address for DeFi Basket (the gas station is in BALANCE_WATCHES_PATH)
+CONTRACT_ADDRESS = "0xee13C86EE4eb1EC3a05E2cc3AB70576F31666b3b"
 
 # URL for Alchemy API
 ALCHEMY_URL = f'https://polygon-mainnet.g.alchemy.com/v2/{os.getenv("ALCHEMY_API_KEY")}'
 
+# Timeouts for each report data source, in seconds
+PORTFOLIO_DATA_TIMEOUT = 60
+TEST_RESULTS_TIMEOUT = 60
+EASY_METRICS_TIMEOUT = 300  # the metrics endpoint can take minutes server-side
+
+# Cache lifetimes for each report data source, in seconds: how long a value is
+# served as fresh, then how long it is still served while being refreshed
+PORTFOLIO_DATA_TTL, PORTFOLIO_DATA_STALE_TTL = 15 * 60, 45 * 60
+TEST_RESULTS_TTL, TEST_RESULTS_STALE_TTL = 5 * 60, 10 * 60
+EASY_METRICS_TTL, EASY_METRICS_STALE_TTL = 10 * 60, 20 * 60
+
+# DeFi Basket event tracker: whether it runs, where its progress is persisted,
+# and the block to start from when there is no checkpoint (defaults to the head)
+EVENT_TRACKER_ENABLED = os.getenv("EVENT_TRACKER_ENABLED", "false").lower() == "true"
+EVENT_TRACKER_CHECKPOINT_PATH = os.getenv(
+    "EVENT_TRACKER_CHECKPOINT_PATH", "data/event_tracker_checkpoint.json"
+)
+EVENT_TRACKER_START_BLOCK = os.getenv("EVENT_TRACKER_START_BLOCK")
+EVENT_TRACKER_CONFIRMATIONS = int(os.getenv("EVENT_TRACKER_CONFIRMATIONS", 3))
+
+# Event notifications are coalesced over a window (seconds) into digests, sent
+# at a sustained rate (messages per second) with some burst allowance
+EVENT_DIGEST_WINDOW = float(os.getenv("EVENT_DIGEST_WINDOW", 5))
+EVENT_DIGEST_RATE = float(os.getenv("EVENT_DIGEST_RATE", 1))
+EVENT_DIGEST_BURST = int(os.getenv("EVENT_DIGEST_BURST", 5))
+
+# Daily report slots (hour, minute) in BRT, how long before each slot the data
+# starts being fetched, and how late a missed slot is still delivered (seconds)
+DAILY_REPORT_TIMES = [(6, 0), (18, 0)]
+DAILY_REPORT_PREFETCH_LEAD = int(os.getenv("DAILY_REPORT_PREFETCH_LEAD", 10 * 60))
+DAILY_REPORT_CATCH_UP_GRACE = int(os.getenv("DAILY_REPORT_CATCH_UP_GRACE", 30 * 60))
+DAILY_REPORT_STATE_PATH = os.getenv(
+    "DAILY_REPORT_STATE_PATH", "data/daily_report_state.json"
+)
+
+# Connection pool limits for the shared HTTP client
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 10))
+
+# Wallet balances watched by check_balance_and_notify, with their minimums
+BALANCE_WATCHES_PATH = os.getenv("BALANCE_WATCHES_PATH", "lib/balance_watches.json")
+
+# Persisted state of the ops alerts, so a restart doesn't fire them again
+ALERT_STATE_PATH = os.getenv("ALERT_STATE_PATH", "data/alert_state.json")
+
+# Server power alert: fires when unplugged or below the alert battery level,
+# resolves once plugged in and back to the clear level (%)
+BATTERY_ALERT_PERCENT = 20
+BATTERY_CLEAR_PERCENT = 25
+
+# Discord role pinged by the ops alerts
+OPS_ROLE_MENTION = "<@&889558855623782462>"
+
+# Liquidity sweep: whether it runs, and the minutes between two sweeps
+LIQUIDITY_SWEEP_ENABLED = os.getenv("LIQUIDITY_SWEEP_ENABLED", "false").lower() == "true"
+LIQUIDITY_SWEEP_INTERVAL = int(os.getenv("LIQUIDITY_SWEEP_INTERVAL", 60))
+
+# How long a liquidity quote is reused by later checks, in seconds
+LIQUIDITY_QUOTE_TTL = int(os.getenv("LIQUIDITY_QUOTE_TTL", 60))
+
 # Event mappings
 EVENT_MAPPING = {
     "Approval": "Approval",
@@ -48,26 +140,137 @@ EVENT_MAPPING = {
 # Set the locale to en_US
 locale.setlocale(locale.LC_ALL, "en_US")
 
-# Load contract ABI from local file
-with open("lib/defi_basket_abi.json") as f:
-    CONTRACT_ABI = json.load(f)
+# Web3 and the DeFi Basket contract, set up on first use by get_contract
+web3 = None
+contract = None
+web3_lock = threading.Lock()
+
+# Daily report schedule, remembering delivered slots across restarts
+daily_report_schedule = DailySchedule(
+    DAILY_REPORT_TIMES,
+    "America/Sao_Paulo",
+    DAILY_REPORT_STATE_PATH,
+    catch_up_grace=DAILY_REPORT_CATCH_UP_GRACE,
+)
 
-# Set up web3 and the contract
-web3 = AsyncWeb3(AsyncHTTPProvider(ALCHEMY_URL))
-contract = web3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+# Task running the DeFi Basket event tracker, once started
+event_tracker_task = None
+
+# Alert state machine of the balance and server power alerts
+alert_manager = AlertManager(ALERT_STATE_PATH)
+
+# Balance monitor, set up with web3 on first use
+balance_monitor = None
+
+# Quote connector shared by every liquidity check, so a quote is reused by the
+# checks of the same pair and size within LIQUIDITY_QUOTE_TTL
+liquidity_connector = CachedQuoteConnector(
+    ParaswapConnector(), ttl=LIQUIDITY_QUOTE_TTL
+)
 
 # Discord bot intents
 intents = discord.Intents.default()
 intents.message_content = True
 
+
+class PicnicBot(commands.Bot):
+    """
+    Discord bot that records its login time and releases the shared HTTP
+    client when it shuts down.
+    """
+
+    async def setup_hook(self):
+        """
+        Record the login time, called once logged in, before the gateway connects.
+        """
+
+        mark_startup("login")
+
+    async def close(self):
+        """
+        Close the shared HTTP client, then the Discord connection.
+        """
+
+        await close_session()
+        await super().close()
+
+
 # Discord bot
-bot = commands.Bot(command_prefix="$", intents=intents)
+bot = PicnicBot(command_prefix="$", intents=intents)
 
 ###
 # Functions, event handlers, and loops
 ###
 
 
+def get_contract():
+    """
+    Get the DeFi Basket contract, setting up web3 on first use.
+
+    Importing web3 takes most of the bot startup time, so main() makes the
+    first call in a background thread while the bot logs in to Discord. For
+    the same reason, the modules the bot imports (quoter, multicall,
+    log_ingestion, ...) only import web3, eth_abi, eth_utils and numpy inside
+    the functions using them, never at module level.
+
+    Returns:
+        The DeFi Basket contract.
+    """
+
+    global web3, contract
+    with web3_lock:
+        if contract is None:
+            from web3 import AsyncWeb3, AsyncHTTPProvider
+
+            # Load contract ABI from local file
+            with open("lib/defi_basket_abi.json") as f:
+                contract_abi = json.load(f)
+            web3 = AsyncWeb3(AsyncHTTPProvider(ALCHEMY_URL))
+            contract = web3.eth.contract(address=CONTRACT_ADDRESS, abi=contract_abi)
+            mark_startup("web3")
+    return contract
+
+
+def get_web3():
+    """
+    Get the AsyncWeb3 instance, setting it up on first use.
+
+    Returns:
+        The AsyncWeb3 instance.
+    """
+
+    get_contract()
+    return web3
+
+
+async def warm_up_provider():
+    """
+    Set up web3 off the event loop and open the provider connection, so the
+    first balance check or log poll doesn't pay for it.
+    """
+
+    await asyncio.to_thread(get_contract)
+    try:
+        await web3.eth.chain_id
+        mark_startup("provider")
+    except Exception as e:
+        print(f"Error occurred warming up the web3 provider: {e}")
+
+
+def format_startup_timings():
+    """
+    Format the startup timings.
+
+    Returns:
+        str: The time each startup step finished at, in order.
+    """
+
+    return ", ".join(
+        f"{step}: {seconds:.2f}s"
+        for step, seconds in sorted(startup_timings.items(), key=lambda item: item[1])
+    )
+
+
 def check_battery():
     """
     Check the current battery status of the machine.
@@ -88,46 +291,44 @@ def check_battery():
     return f"{percent}% | {plugged}"
 
 
-async def handle_event(event):
+def format_event(event):
     """
-    Handles a new event from the Ethereum network.
+    Format a decoded event as a digest entry.
 
     Args:
-        event: The event data.
+        event: The decoded event data.
+
+    Returns:
+        str: The formatted event.
     """
 
-    message = f"""
-**:zap: PICNIC - Transaction tracker :zap:**
+    tx_hash = get_web3().to_hex(event["transactionHash"])
+    return f"""
+:small_orange_diamond: **{EVENT_MAPPING.get(event['event'], event['event'])}** | block {event['blockNumber']} | [`{tx_hash[:10]}…`](https://polygonscan.com/tx/{tx_hash})
+:small_blue_diamond: **Event header**: {event['event']}({', '.join([f"{k}: {v}" for k, v in event['args'].items()])})"""
 
-A new **{event.event_name}** transaction has been detected.
 
-:small_orange_diamond: **Network**: Polygon
-:small_blue_diamond: **Address**: `0x{event['address'].hex()}`
-:small_orange_diamond: **Hash**: `0x{event['transactionHash'].hex()}`
-:small_blue_diamond: **Link**: [Verifique a transação aqui] (https://polygonscan.com/tx/0x{event['transactionHash'].hex()})
-:small_orange_diamond: **Event header**: {event['event']}({', '.join([f"{k}: {v}" for k, v in event['args'].items()])})
-"""
-    channel = bot.get_channel(OPS_CHANNEL_ID)
-    await channel.send(message)
+async def handle_event(event):
+    """
+    Handles a new event from the Ethereum network, queueing it for the next digest.
 
+    Args:
+        event: The decoded event data.
+    """
+
+    await event_notifier.put(format_event(event))
 
-async def log_loop(event_filter, poll_interval):
+
+async def send_to_ops_channel(message):
     """
-    Logs new Ethereum events in a loop.
+    Send a message to the ops channel.
 
     Args:
-        event_filter: The filter used to catch new events.
-        poll_interval (int): The time to wait between each check for new events, in seconds.
+        message (str): The message content.
     """
 
-    while True:
-        try:
-            print("Checking for new events...")
-            for event in await event_filter.get_new_entries():
-                await handle_event(event)
-        except Exception as e:
-            print(f"Error occurred in log_loop: {e}")
-        await asyncio.sleep(poll_interval)
+    channel = bot.get_channel(OPS_CHANNEL_ID)
+    await channel.send(message)
 
 
 async def get_test_results():
@@ -141,44 +342,101 @@ async def get_test_results():
     url = "https://www.tesults.com/api/results?target=1658326264884"
     headers = {"Authorization": f"Bearer {TESULTS_TOKEN}"}
 
-    # Make the API request
-    response = requests.get(url, headers=headers)
-    # Make sure the request was successful
-
-    if response.status_code == 200:
-        SUITES = [
-            "Featured portfolio withdraw (prod)",
-            "Clone featured portfolios - prod",
-        ]
-        total_pass = []
-        total_fail = []
+    # Make the API request on the shared, pooled HTTP client
+    async with get_session().get(url, headers=headers) as response:
+        # Make sure the request was successful
+        if response.status != 200:
+            raise Exception(f"Tesults responded with {response.status}")
 
         # Parse the response as JSON
-        results = response.json()["data"]["results"]["runs"]
+        results = (await response.json())["data"]["results"]["runs"]
 
-        for result in results:
-            for test in result["cases"]:
-                if test["suite"] in SUITES:
-                    if test["result"] == "pass":
-                        total_pass.append(test["name"])
-                    else:
-                        total_fail.append(test["name"])
+    SUITES = [
+        "Featured portfolio withdraw (prod)",
+        "Clone featured portfolios - prod",
+    ]
+    total_pass = []
+    total_fail = []
 
-        return total_pass, total_fail
-    else:
-        print(f"Error occurred: code {response.status_code}")
+    for result in results:
+        for test in result["cases"]:
+            if test["suite"] in SUITES:
+                if test["result"] == "pass":
+                    total_pass.append(test["name"])
+                else:
+                    total_fail.append(test["name"])
 
+    return total_pass, total_fail
 
-async def get_balance():
+
+def get_balance_monitor():
     """
-    Get the balance of the gas station.
+    Get the monitor of the watched wallet balances, setting it up on first use.
 
     Returns:
-        float: The balance of the gas station in ether.
+        BalanceMonitor: The balance monitor.
     """
 
-    balance = await web3.eth.get_balance(GAS_STATION_ADDRESS)
-    return Web3.from_wei(balance, "ether")
+    global balance_monitor
+    if balance_monitor is None:
+        balance_monitor = BalanceMonitor(
+            get_web3(), load_watches(BALANCE_WATCHES_PATH, registry), alert_manager
+        )
+    return balance_monitor
+
+
+def format_alert_duration(key):
+    """
+    Format how long an alert has been firing.
+
+    Args:
+        key (str): The alert identifier.
+
+    Returns:
+        str: The duration, like "2h 30m".
+    """
+
+    minutes = int((alert_manager.duration(key) or 0) // 60)
+    return f"{minutes // 60}h {minutes % 60}m" if minutes >= 60 else f"{minutes}m"
+
+
+def format_balance_alert(event, watch, balance):
+    """
+    Format a low balance alert message.
+
+    Args:
+        event (str): The alert event, FIRE, SUSTAIN or RESOLVE.
+        watch (BalanceWatch): The balance watch.
+        balance (float): The balance, in token units.
+
+    Returns:
+        str: The message.
+    """
+
+    if event == FIRE:
+        return f"""**:rotating_light: {watch.name.upper()}**: {OPS_ROLE_MENTION}, the balance of the {watch.name} wallet (`{watch.wallet}`) is too low: {balance:.4f} {watch.symbol}, minimum {watch.min_balance} {watch.symbol}"""
+    if event == SUSTAIN:
+        return f"""**:rotating_light: {watch.name.upper()}**: {OPS_ROLE_MENTION}, the balance of the {watch.name} wallet is still too low after {format_alert_duration(watch.alert_key)}: {balance:.4f} {watch.symbol}"""
+    return f"""**:white_check_mark: {watch.name.upper()}**: the balance of the {watch.name} wallet is back to {balance:.4f} {watch.symbol}"""
+
+
+def format_power_alert(event, battery_status):
+    """
+    Format a server power alert message.
+
+    Args:
+        event (str): The alert event, FIRE, SUSTAIN or RESOLVE.
+        battery_status (str): The battery status.
+
+    Returns:
+        str: The message.
+    """
+
+    if event == FIRE:
+        return f"""**:rotating_light: SERVER POWER**: {OPS_ROLE_MENTION}, the server power status is critical: {battery_status}"""
+    if event == SUSTAIN:
+        return f"""**:rotating_light: SERVER POWER**: {OPS_ROLE_MENTION}, the server power status is still critical after {format_alert_duration("server_power")}: {battery_status}"""
+    return f"""**:white_check_mark: SERVER POWER**: the server power status is back to normal: {battery_status}"""
 
 
 def split_message(content, limit=2000):
@@ -206,6 +464,19 @@ def split_message(content, limit=2000):
     return messages
 
 
+# Outbound queue packing event notifications into rate-limited digests
+event_notifier = DigestNotifier(
+    send_to_ops_channel,
+    header=f"""**:zap: PICNIC - Transaction tracker :zap:**
+
+New transactions detected on Polygon (`{CONTRACT_ADDRESS}`):
+""",
+    window=EVENT_DIGEST_WINDOW,
+    rate=EVENT_DIGEST_RATE,
+    burst=EVENT_DIGEST_BURST,
+)
+
+
 def calculate_total_asset_sums(asset_sums):
     """
     Calculate the total asset sums.
@@ -216,64 +487,109 @@ def calculate_total_asset_sums(asset_sums):
     Returns:
         float: The total asset sums.
     """
-    # calculate asset value mapping, like USDC = 1, USDT = 1, BRLA = 0.20
-    asset_values = {
-        "USDC": 1,
-        "USDCE": 1,
-        "USDT": 1,
-        "BRLA": 0.20,
-        "DAI": 1,
-        "EURe": 1.1,
-    }
-
     total = 0
     for asset, value in asset_sums.items():
-        if asset in asset_values:
-            total += asset_values[asset] * value
+        # Reference USD value of the asset, like USDC = 1, BRLA = 0.20
+        asset_value = registry.usd_value(asset)
+        if asset_value is not None:
+            total += asset_value * value
     return total
 
 
-async def report_body(report_title, type="std"):
+async def get_easy_metrics():
     """
-    Generate the body of a report.
+    Get the platform metrics from the Picnic easy-metrics API.
+
+    Returns:
+        dict: The metrics found under the "data" key of the API response.
+    """
+
+    # Make the API request on the shared, pooled HTTP client
+    async with get_session().get(
+        "https://dev.picnicinvestimentos.com/api/get-easy-metrics-2",
+        timeout=aiohttp.ClientTimeout(total=EASY_METRICS_TIMEOUT),
+    ) as response:
+        if response.status != 200:
+            raise Exception(
+                f"API responded with {response.status}: {await response.text()}"
+            )
+        data = await response.json()
+        # check if data contains the expected keys
+        if "data" not in data:
+            raise Exception(f"API responded with unexpected data: {data}")
+
+    return data["data"]
+
+
+# Caches in front of the report data sources, shared by every report
+portfolio_data_cache = CachedFetcher(
+    "portfolio data",
+    get_portfolio_data,
+    ttl=PORTFOLIO_DATA_TTL,
+    stale_ttl=PORTFOLIO_DATA_STALE_TTL,
+)
+test_results_cache = CachedFetcher(
+    "test results",
+    get_test_results,
+    ttl=TEST_RESULTS_TTL,
+    stale_ttl=TEST_RESULTS_STALE_TTL,
+)
+easy_metrics_cache = CachedFetcher(
+    "easy metrics",
+    get_easy_metrics,
+    ttl=EASY_METRICS_TTL,
+    stale_ttl=EASY_METRICS_STALE_TTL,
+)
+
+
+async def fetch_report_source(name, coro, timeout):
+    """
+    Await one of the report data sources, bounded by its own timeout.
 
     Args:
-        report_title (str): The title of the report.
-        type (str, optional): The type of report ("std" or "full"). Defaults to "std".
+        name (str): The name of the source, used for logging.
+        coro: The coroutine fetching the source.
+        timeout (int): The maximum time to wait for the source, in seconds.
 
     Returns:
-        tuple: A tuple containing the report body and any extended content.
+        tuple: A tuple containing the result (None on failure) and the error message (None on success).
     """
 
-    # Get portfolios data string
-    portfolio_str = await get_portfolio_data()
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout), None
+    except asyncio.TimeoutError:
+        print(f"Timed out fetching {name} after {timeout}s")
+        return None, f"timed out after {timeout}s"
+    except Exception as e:
+        print(f"Error occurred fetching {name}: {e}")
+        return None, str(e) or e.__class__.__name__
 
-    (
-        total_pass,
-        total_fail,
-    ) = await get_test_results()  # Call the new function to get test results
 
-    # Make the API request
-    retry_strategy = aiohttp_retry.ExponentialRetry(
-        attempts=3  # Number of retry attempts
-    )
-    # Make the API request
-    async with aiohttp_retry.RetryClient(retry_options=retry_strategy) as session:
-        async with session.get(
-            "https://dev.picnicinvestimentos.com/api/get-easy-metrics-2",
-            timeout=300,  # 5 minutes in seconds
-        ) as response:
-            if response.status != 200:
-                raise Exception(
-                    f"API responded with {response.status}: {await response.text()}"
-                )
-            data = await response.json()
-            # check if data contains the expected keys
-            if "data" not in data:
-                raise Exception(f"API responded with unexpected data: {data}")
+def format_unavailable_section(error):
+    """
+    Format the placeholder shown in place of a report section whose source failed.
+
+    Args:
+        error (str): The error message of the failed source.
+
+    Returns:
+        str: The placeholder line.
+    """
+
+    return f"    > :warning: unavailable: {error}"
+
+
+def format_metrics_section(data):
+    """
+    Format the platform metrics section of a report.
+
+    Args:
+        data (dict): The metrics returned by get_easy_metrics.
+
+    Returns:
+        str: The formatted metrics section.
+    """
 
-    # Retrieve the desired metrics
-    data = data["data"]
     num_of_users = data["numOfUsers"]
     num_of_smart_accounts = data["numOfSmartAccounts"]
     num_of_active_smart_accounts = data["numOfActiveSmartAccounts"]
@@ -290,11 +606,60 @@ async def report_body(report_title, type="std"):
     # addresses_with_balance_or_portfolio = data["metrics"][
     #     "numberOfAddressesWithBalanceOrPortfolio"
     # ]
-    portfolios = data["portfoliosValues"]
 
     # Calculate total tvl
     smart_account_tokens_tvl = smart_accounts_tvl - smart_accounts_portfolios_tvl
 
+    return f"""    > **smart accounts created**
+    > {num_of_smart_accounts}
+    > **active smart accounts**
+    > {num_of_active_smart_accounts}
+    > **dormant smart accounts**
+    > {num_of_dormant_smart_accounts}
+    > 
+    > **ext wallet smart accounts**
+    > {data["extWalletMetrics"]["numOfExternalWalletSmartAccounts"]}
+    > **ext wallet sa with value**
+    > {data["extWalletMetrics"]["numOfExternalWalletSmartAccountsWithValue"]}
+    > **ext wallet sum of values**
+    > {data["extWalletMetrics"]["sumOfValues"]}
+    > 
+    > **users created** 
+    > {num_of_users}
+    > 
+    > **smart accounts total tvl**
+    > {locale.currency(smart_accounts_tvl, grouping=True)}
+    > **smart accounts portfolios tvl**
+    > {locale.currency(smart_accounts_portfolios_tvl, grouping=True)}
+    > **smart accounts tokens tvl**
+    > {locale.currency(smart_account_tokens_tvl, grouping=True)}
+    > **number of portfolios** 
+    > {num_of_portfolios}
+    > **avg value per portfolio**
+    > {locale.currency(smart_accounts_portfolios_tvl / num_of_portfolios, grouping=True)}
+    > **avg value per account**
+    > {locale.currency(smart_accounts_tvl / num_of_active_smart_accounts, grouping=True)}
+    > 
+    > **revenue 24h**
+    > {locale.currency(revenue_24h, grouping=True)}
+    > **revenue 7 days**
+    > {locale.currency(revenue_7d, grouping=True)}"""
+
+
+def format_portfolio_values_section(data):
+    """
+    Format the portfolios values section of a report.
+
+    Args:
+        data (dict): The metrics returned by get_easy_metrics.
+
+    Returns:
+        str: The formatted portfolios values, one line per portfolio.
+    """
+
+    smart_accounts_portfolios_tvl = data["totalPortfoliosValue"]
+    portfolios = data["portfoliosValues"]
+
     # Sort the portfolios by 'totalValue' in descending order
     sorted_portfolios = dict(
         sorted(portfolios.items(), key=lambda item: item[1]["totalValue"], reverse=True)
@@ -305,12 +670,82 @@ async def report_body(report_title, type="std"):
 
     for nft_id, portfolio in sorted_portfolios.items():
         # Calculate the portfolio's percentage of the total tvl
-        # print("pct calc", portfolio["totalValue"], smart_accounts_portfolios_tvl)
         portfolio_percentage = (
             portfolio["totalValue"] / smart_accounts_portfolios_tvl
         ) * 100
         portfolio_values_str += f'> `name`: {portfolio.get("name", "N/A")}, `Total number`: {portfolio.get("totalNumber", 0)}, `Total value`: {locale.currency(portfolio.get("totalValue", 0), grouping=True)}, `Pct`: {portfolio_percentage:.2f}%\n'
 
+    return portfolio_values_str
+
+
+def format_tests_section(test_results):
+    """
+    Format the baskets tests section of a report.
+
+    Args:
+        test_results (tuple): The passed and failed tests returned by get_test_results.
+
+    Returns:
+        str: The formatted tests section.
+    """
+
+    total_pass, total_fail = test_results
+    return f"""    > {len(total_pass)} successes, {len(total_fail)} fails
+    {f'> failure list: {total_fail}' if len(total_fail) > 0 else ''}"""
+
+
+async def report_body(report_title, type="std", fresh=False):
+    """
+    Generate the body of a report.
+
+    The portfolio data, test results and platform metrics are fetched
+    concurrently through their caches, each bounded by its own timeout. A
+    source that fails or times out only replaces its own sections with a
+    warning, so the rest of the report is still delivered.
+
+    Args:
+        report_title (str): The title of the report.
+        type (str, optional): The type of report ("std" or "full"). Defaults to "std".
+        fresh (bool, optional): Whether to bypass the caches and fetch every source again. Defaults to False.
+
+    Returns:
+        tuple: A tuple containing the report body and any extended content.
+    """
+
+    (
+        (portfolio_str, portfolio_error),
+        (test_results, tests_error),
+        (data, metrics_error),
+    ) = await asyncio.gather(
+        fetch_report_source(
+            "portfolio data",
+            portfolio_data_cache.get(fresh=fresh),
+            PORTFOLIO_DATA_TIMEOUT,
+        ),
+        fetch_report_source(
+            "test results", test_results_cache.get(fresh=fresh), TEST_RESULTS_TIMEOUT
+        ),
+        fetch_report_source(
+            "easy metrics", easy_metrics_cache.get(fresh=fresh), EASY_METRICS_TIMEOUT
+        ),
+    )
+
+    # Render each section on its own, so a bad payload only degrades its section
+    def render(section_formatter, result, error):
+        if error is not None:
+            return format_unavailable_section(error)
+        try:
+            return section_formatter(result)
+        except Exception as e:
+            print(f"Error occurred formatting report section: {e}")
+            return format_unavailable_section(f"unexpected data ({e})")
+
+    metrics_str = render(format_metrics_section, data, metrics_error)
+    tests_str = render(format_tests_section, test_results, tests_error)
+    portfolio_values_str = render(format_portfolio_values_section, data, metrics_error)
+    if portfolio_error is not None:
+        portfolio_str = format_unavailable_section(portfolio_error)
+
     # Make the API request for migration metrics
     # async with aiohttp_retry.RetryClient(retry_options=retry_strategy) as session:
     #     async with session.get(
@@ -330,50 +765,13 @@ async def report_body(report_title, type="std"):
     # for address in top20Addresses:
     #     formatted_top20_addresses += f"> `Address`: {address['ownerAddress']}, `Value`: {address['totalOwnerInvestedValue']}\n"
 
-    # Get and format balance to two decimal places for readability
-    # balance = await get_balance()
-    # formatted_balance = "{:.2f}".format(balance)
     report_str = f"""
     > **:bar_chart: PICNIC BRASIL - {report_title} :bar_chart:**
     > 
-    > **smart accounts created**
-    > {num_of_smart_accounts}
-    > **active smart accounts**
-    > {num_of_active_smart_accounts}
-    > **dormant smart accounts**
-    > {num_of_dormant_smart_accounts}
-    > 
-    > **ext wallet smart accounts**
-    > {data["extWalletMetrics"]["numOfExternalWalletSmartAccounts"]}
-    > **ext wallet sa with value**
-    > {data["extWalletMetrics"]["numOfExternalWalletSmartAccountsWithValue"]}
-    > **ext wallet sum of values**
-    > {data["extWalletMetrics"]["sumOfValues"]}
-    > 
-    > **users created** 
-    > {num_of_users}
-    > 
-    > **smart accounts total tvl**
-    > {locale.currency(smart_accounts_tvl, grouping=True)}
-    > **smart accounts portfolios tvl**
-    > {locale.currency(smart_accounts_portfolios_tvl, grouping=True)}
-    > **smart accounts tokens tvl**
-    > {locale.currency(smart_account_tokens_tvl, grouping=True)}
-    > **number of portfolios** 
-    > {num_of_portfolios}
-    > **avg value per portfolio**
-    > {locale.currency(smart_accounts_portfolios_tvl / num_of_portfolios, grouping=True)}
-    > **avg value per account**
-    > {locale.currency(smart_accounts_tvl / num_of_active_smart_accounts, grouping=True)}
-    > 
-    > **revenue 24h**
-    > {locale.currency(revenue_24h, grouping=True)}
-    > **revenue 7 days**
-    > {locale.currency(revenue_7d, grouping=True)}
+{metrics_str}
     > 
     > **baskets tests**
-    > {len(total_pass)} successes, {len(total_fail)} fails
-    {f'> failure list: {total_fail}' if len(total_fail) > 0 else ''}
+{tests_str}
     """
     report_extended_str = ""
     if report_title == "Daily Morning Report" or type == "full":
@@ -385,9 +783,45 @@ async def report_body(report_title, type="std"):
     > **portfolios values**
     {portfolio_values_str}
     """
+
+    print(f"HTTP connection stats: {connection_stats()}")
     return report_str, report_extended_str
 
 
+def check_liquidity(token0, token1, amounts=None):
+    """
+    Check the liquidity of a token pair. Blocking, run it in a thread.
+
+    Args:
+        token0: The input token.
+        token1: The output token.
+        amounts (list, optional): The USD amounts to quote. Defaults to the calculator's.
+
+    Returns:
+        LiquidityReport: The quotes of every amount.
+    """
+
+    calculator = LiquidityCalculator(
+        [liquidity_connector], token0, token1, amounts=amounts
+    )
+    return calculator.check_liquidity()
+
+
+def format_liquidity_report(report):
+    """
+    Format a liquidity report for Discord.
+
+    Args:
+        report (LiquidityReport): The liquidity report.
+
+    Returns:
+        str: The formatted report.
+    """
+
+    return f"""**:droplet: Liquidity {report.token0.symbol} -> {report.token1.symbol}** (Base Rate: {report.base_rate:.6f})
+{report.format()}"""
+
+
 @bot.event
 async def on_ready():
     """
@@ -395,22 +829,39 @@ async def on_ready():
     """
 
     print(f"We have logged in as {bot.user}")
-    daily_report.start()
-    check_balance_and_notify.start()
-    tasks = []
-
-    # print("Contract events: ", contract.events)
-    # for event in contract.events:
-    #     event_filter = await contract.events[event.event_name].create_filter(
-    #         # fromBlock="latest"
-    #         fromBlock=46827233
-    #     )
-    #     # print(f"Created filter for {event.event_name}")
-    #     tasks.append(log_loop(event_filter, 2))
-    try:
-        await asyncio.gather(*tasks)  # Change this line
-    except Exception as e:
-        print(f"Error occurred: {e}")
+
+    # Open the HTTP client shared by every task and command
+    open_session(limit=HTTP_POOL_LIMIT, limit_per_host=HTTP_POOL_LIMIT_PER_HOST)
+
+    if "ready" not in startup_timings:
+        # Web3 is set up during the login, wait for it before the loops need it
+        await warm_up_provider()
+        mark_startup("ready")
+        print(f"Startup times: {format_startup_timings()}")
+
+    # on_ready fires again after reconnects, so only start the loops once
+    if not daily_report.is_running():
+        daily_report.start()
+    if not check_balance_and_notify.is_running():
+        check_balance_and_notify.start()
+    if LIQUIDITY_SWEEP_ENABLED and not liquidity_sweep.is_running():
+        liquidity_sweep.start()
+
+    global event_tracker_task
+    if EVENT_TRACKER_ENABLED and event_tracker_task is None:
+        # A single eth_getLogs loop over block ranges covers every contract event
+        event_tracker = LogIngestor(
+            get_web3(),
+            get_contract(),
+            handle_event,
+            EVENT_TRACKER_CHECKPOINT_PATH,
+            start_block=(
+                int(EVENT_TRACKER_START_BLOCK) if EVENT_TRACKER_START_BLOCK else None
+            ),
+            confirmations=EVENT_TRACKER_CONFIRMATIONS,
+        )
+        event_tracker_task = asyncio.ensure_future(event_tracker.run())
+        asyncio.ensure_future(event_notifier.run())
 
 
 @bot.event
@@ -436,17 +887,20 @@ async def on_message(message):
 
 
 @bot.command()
-async def report(ctx, report_type=""):
+async def report(ctx, *options):
     """
     Bot command to generate a report.
 
     Args:
         ctx: The command context.
-        report_type (str, optional): The type of report ("std" or "full"). Defaults to "".
+        options (str): Any of "full", for the extended report, and "fresh", to bypass the cached data.
     """
 
+    report_type = "full" if "full" in options else ""
     try:
-        report_str, report_extended_str = await report_body("Report", type=report_type)
+        report_str, report_extended_str = await report_body(
+            "Report", type=report_type, fresh="fresh" in options
+        )
         chunks = split_message(report_str)
         for chunk in chunks:
             await ctx.send(chunk)
@@ -458,57 +912,157 @@ async def report(ctx, report_type=""):
         await ctx.send(f"An error occurred: {e}")
 
 
-@tasks.loop(minutes=1)
+@bot.command()
+async def liquidity(ctx, token0=None, token1=None, *sizes):
+    """
+    Bot command to check the liquidity of a token pair.
+
+    Args:
+        ctx: The command context.
+        token0 (str): The key of the input token, like BRLA.
+        token1 (str): The key of the output token, like USDC.
+        sizes (str): The positive USD amounts to quote. Defaults to the calculator's.
+    """
+
+    usage = f"Usage: `$liquidity <TOKEN0> <TOKEN1> [sizes]`, tokens: {', '.join(tokens)}"
+    if token0 is None or token1 is None:
+        await ctx.send(usage)
+        return
+    token0, token1 = tokens.get(token0.upper()), tokens.get(token1.upper())
+    try:
+        amounts = [float(size.replace(",", "")) for size in sizes] or None
+    except ValueError:
+        amounts = []
+    if (
+        token0 is None
+        or token1 is None
+        or token0 == token1
+        or amounts == []
+        or any(not 0 < amount < float("inf") for amount in amounts or [])
+    ):
+        await ctx.send(usage)
+        return
+
+    await ctx.send(f"Checking liquidity for {token0.symbol} -> {token1.symbol}...")
+    try:
+        # The quotes are blocking calls, keep them off the event loop
+        report = await asyncio.to_thread(check_liquidity, token0, token1, amounts)
+        for chunk in split_message(format_liquidity_report(report)):
+            await ctx.send(chunk)
+    except Exception as e:
+        await ctx.send(f"An error occurred: {e}")
+    print(f"Quote cache stats: {liquidity_connector.stats()}")
+
+
+@tasks.loop()
 async def daily_report():
     """
     Task loop to generate daily reports.
+
+    Each iteration waits for the next slot of the daily report schedule. The
+    report data starts being fetched DAILY_REPORT_PREFETCH_LEAD seconds before
+    the slot, and the report is sent at the slot itself, at most once.
     """
 
-    now = datetime.now(pytz.timezone("America/Sao_Paulo"))
+    slot = daily_report_schedule.next_slot()
+    # Define report title based on the time
+    report_title = "Daily Morning Report" if slot.hour == 6 else "Daily Afternoon Report"
+    print(f"Next {report_title} scheduled for {slot.isoformat()}")
 
-    if now.hour in [6, 18] and now.minute == 00:  # 6:00am and 6:00pm BRT
-        # if now.hour in [6, 18] and now.minute == 21:  # 6:00am and 6:00pm BRT
-        # Define report title based on the time
-        report_title = (
-            "Daily Morning Report" if now.hour == 6 else "Daily Afternoon Report"
-        )
-        report_str, report_extended_str = await report_body(report_title, type="full")
-        channel = bot.get_channel(OPS_CHANNEL_ID)
-        chunks = split_message(report_str)
-        for chunk in chunks:
-            # print("test", len(chunk))
-            await channel.send(chunk)
-        chunks_ext = split_message(report_extended_str)
-        # x = 1
-        for chunk in chunks_ext:
-            # print(x, len(chunk))
-            # x += 1
-            await channel.send(chunk)
+    # Start fetching the report data ahead of the slot
+    await discord.utils.sleep_until(
+        slot - timedelta(seconds=DAILY_REPORT_PREFETCH_LEAD)
+    )
+    prefetch = asyncio.ensure_future(
+        report_body(report_title, type="full", fresh=True)
+    )
+    await discord.utils.sleep_until(slot)
+
+    try:
+        report_str, report_extended_str = await prefetch
+    except Exception as e:
+        print(f"Error occurred generating {report_title}: {e}")
+        return
+
+    if not daily_report_schedule.claim(slot):
+        print(f"{report_title} for {slot.isoformat()} was already delivered")
+        return
+
+    channel = bot.get_channel(OPS_CHANNEL_ID)
+    chunks = split_message(report_str)
+    for chunk in chunks:
+        await channel.send(chunk)
+    chunks_ext = split_message(report_extended_str)
+    for chunk in chunks_ext:
+        await channel.send(chunk)
 
 
 @tasks.loop(minutes=5)
 async def check_balance_and_notify():
     """
-    Task loop to check the balance of the gas station and notify if it's too low.
+    Task loop to check the watched wallet balances (like the gas station's)
+    and the server power, and notify if they're too low.
     """
 
     channel = bot.get_channel(OPS_CHANNEL_ID)
-    balance = await get_balance()
-    low_balance = balance < 20
-    if low_balance:
-        await channel.send(
-            f"""**:rotating_light: GAS STATION**: <@&889558855623782462>, the balance of our gas station wallet is too low: {balance} MATIC"""
-        )
+
+    # Every balance is read in one batch. Each incident is notified when it
+    # starts, reminded with growing intervals and notified when it resolves.
+    try:
+        events = await get_balance_monitor().check()
+    except Exception as e:
+        print(f"Error occurred checking balances: {e}")
+        events = []
+    for event, watch, balance in events:
+        await channel.send(format_balance_alert(event, watch, balance))
 
     # Check battery status
-    battery_status = check_battery()
-    if "Not Plugged In" in battery_status or int(battery_status.split("%")[0]) < 20:
-        await channel.send(
-            f"""**:rotating_light: SERVER POWER**: <@&889558855623782462>, the server power status is critical: {battery_status}"""
+    battery = psutil.sensors_battery()
+    if battery is not None:
+        event = alert_manager.evaluate(
+            "server_power",
+            not battery.power_plugged or battery.percent < BATTERY_ALERT_PERCENT,
+            battery.power_plugged and battery.percent >= BATTERY_CLEAR_PERCENT,
+            battery.percent,
         )
+        if event is not None:
+            await channel.send(format_power_alert(event, check_battery()))
+
+
+@tasks.loop(minutes=LIQUIDITY_SWEEP_INTERVAL)
+async def liquidity_sweep():
+    """
+    Task loop to check the liquidity of every pair, in both directions, and
+    notify the ops channel of the pairs lacking liquidity or quoted off-rate.
+    """
+
+    alerts = ""
+    for token0, token1 in pairs:
+        for input_token, output_token in ((token0, token1), (token1, token0)):
+            # One direction at a time: the quotes share the Paraswap rate
+            # limit, and quotes queued behind it would hit the engine timeout
+            try:
+                report = await asyncio.to_thread(
+                    check_liquidity, input_token, output_token
+                )
+            except Exception as e:
+                print(
+                    f"Error occurred checking {input_token.symbol}-{output_token.symbol}: {e}"
+                )
+                continue
+            if report.flagged():
+                alerts += format_liquidity_report(report) + "\n"
+    if alerts:
+        channel = bot.get_channel(OPS_CHANNEL_ID)
+        for chunk in split_message(f"**:rotating_light: LIQUIDITY**\n{alerts}"):
+            await channel.send(chunk)
+
+    print(f"Quote cache stats: {liquidity_connector.stats()}")
 
 
 def main():
+    # Set up web3 in the background while the bot logs in to Discord
+    threading.Thread(target=get_contract, daemon=True).start()
     bot.run(DISCORD_TOKEN)
 
 
@@ -0,0 +1,102 @@
+import time
+import asyncio
+
+
+class CachedFetcher:
+    """
+    Cache the result of an async fetcher with a TTL, stale-while-revalidate
+    and request coalescing.
+
+    A value younger than `ttl` is served from memory. A value older than `ttl`
+    but younger than `ttl + stale_ttl` is still served, while a single refresh
+    runs in the background. Concurrent callers needing a fetch all share the
+    same in-flight request. Failed fetches are never cached.
+    """
+
+    def __init__(self, name, fetch, ttl, stale_ttl=0):
+        """
+        Args:
+            name (str): The name of the source, used for logging.
+            fetch: A coroutine function fetching a fresh value.
+            ttl (float): How long a value is served as fresh, in seconds.
+            stale_ttl (float, optional): How long after `ttl` a value is still served while it is refreshed, in seconds. Defaults to 0.
+        """
+
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.value = None
+        self.fetched_at = None
+        self.in_flight = None
+        self.hits = 0
+        self.misses = 0
+
+    def age(self):
+        """
+        Get the age of the cached value.
+
+        Returns:
+            float: The age in seconds, or None if nothing is cached.
+        """
+
+        if self.fetched_at is None:
+            return None
+        return time.monotonic() - self.fetched_at
+
+    async def get(self, fresh=False):
+        """
+        Get the value, from the cache when possible.
+
+        Args:
+            fresh (bool, optional): Whether to bypass the cache and wait for a new fetch. Defaults to False.
+
+        Returns:
+            The cached or freshly fetched value.
+        """
+
+        age = self.age()
+        if not fresh and age is not None:
+            if age < self.ttl:
+                self.hits += 1
+                return self.value
+            if age < self.ttl + self.stale_ttl:
+                self.hits += 1
+                self.refresh()
+                return self.value
+
+        self.misses += 1
+        # Shield the shared fetch, so a caller timing out doesn't cancel it for the others
+        return await asyncio.shield(self.refresh())
+
+    def refresh(self):
+        """
+        Start a fetch, unless one is already in flight.
+
+        Returns:
+            asyncio.Task: The in-flight fetch.
+        """
+
+        if self.in_flight is None:
+            self.in_flight = asyncio.ensure_future(self._fetch())
+            self.in_flight.add_done_callback(self._on_fetch_done)
+        return self.in_flight
+
+    async def _fetch(self):
+        value = await self.fetch()
+        self.value = value
+        self.fetched_at = time.monotonic()
+        return value
+
+    def _on_fetch_done(self, task):
+        self.in_flight = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error occurred refreshing {self.name}: {task.exception()}")
+
+    def invalidate(self):
+        """
+        Drop the cached value, so the next call fetches it again.
+        """
+
+        self.value = None
+        self.fetched_at = None
@@ -0,0 +1,119 @@
+import time
+import threading
+import requests
+
+COINBASE_RATES_URL = "https://api.coinbase.com/v2/exchange-rates"
+
+
+class FxRateProvider:
+    """
+    Shared exchange rates, cached for `ttl` seconds.
+
+    A single Coinbase request returns the rate of every currency against the
+    anchor currency, so all the rates are fetched at once and cross rates
+    (e.g. BRL -> USD -> ETH) are computed locally. When a refresh fails, the
+    last good rates keep being served.
+    """
+
+    TIMEOUT = 10  # seconds
+
+    def __init__(self, ttl=60, anchor="USD"):
+        """
+        Args:
+            ttl (int, optional): How long fetched rates are fresh, in seconds. Defaults to 60.
+            anchor (str, optional): The currency the rates are fetched against. Defaults to "USD".
+        """
+
+        self.ttl = ttl
+        self.anchor = anchor
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.rates = None  # units of each currency per anchor unit
+        self.fetched_at = None
+        self.retry_at = 0  # no refresh before then, after a failed one
+
+    def fetch(self):
+        """
+        Fetch the rate of every currency against the anchor currency.
+
+        Returns:
+            dict: The units of each currency per anchor unit.
+        """
+
+        response = self.session.get(
+            COINBASE_RATES_URL,
+            params={"currency": self.anchor},
+            timeout=self.TIMEOUT,
+        )
+        response.raise_for_status()
+        rates = response.json()["data"]["rates"]
+        return {currency: float(rate) for currency, rate in rates.items()}
+
+    def is_fresh(self):
+        if self.rates is not None and time.time() < self.retry_at:
+            return True
+        return self.fetched_at is not None and time.time() - self.fetched_at < self.ttl
+
+    def get_all(self):
+        """
+        Get the rates against the anchor currency, refreshing them if stale.
+
+        Returns:
+            dict: The units of each currency per anchor unit.
+
+        Raises:
+            Exception: If the rates were never fetched successfully.
+        """
+
+        if self.is_fresh():
+            return self.rates
+        with self.lock:
+            # Another thread may have refreshed them while this one waited
+            if self.is_fresh():
+                return self.rates
+            try:
+                self.rates = self.fetch()
+                self.fetched_at = time.time()
+            except Exception as e:
+                if self.rates is None:
+                    raise Exception(f"No exchange rates available: {e}")
+                # Serve the last good rates for a while instead of retrying on every call
+                self.retry_at = time.time() + min(self.ttl, self.TIMEOUT)
+                print(
+                    f"Error occurred fetching exchange rates, using rates from "
+                    f"{time.time() - self.fetched_at:.0f}s ago: {e}"
+                )
+        return self.rates
+
+    def get_rate(self, base, quote):
+        """
+        Get how many units of a currency one unit of another buys.
+
+        Args:
+            base (str): The currency converted from.
+            quote (str): The currency converted to.
+
+        Returns:
+            float: The units of `quote` per unit of `base`.
+        """
+
+        rates = self.get_all()
+        return rates[quote] / rates[base]
+
+    def get_rates(self, base):
+        """
+        Get the rates of every currency against one currency.
+
+        Args:
+            base (str): The currency converted from.
+
+        Returns:
+            dict: The units of each currency per unit of `base`.
+        """
+
+        rates = self.get_all()
+        return {currency: rate / rates[base] for currency, rate in rates.items()}
+
+
+# Rates shared by every user of this process
+fx_rates = FxRateProvider()
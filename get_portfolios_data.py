@@ -1,4 +1,4 @@
-import requests
+from http_client import get_session
 
 
 async def get_portfolio_data():
@@ -11,7 +11,10 @@ async def get_portfolio_data():
     starting with "Easy_CT" are excluded from the result.
 
     Returns:
-        str: A string of sorted portfolio data, or an error message if the API request fails.
+        str: A string of sorted portfolio data.
+
+    Raises:
+        Exception: If the API request fails.
     """
 
     # The headers for the API request
@@ -63,28 +66,27 @@ async def get_portfolio_data():
         "perPage": 999,
     }
 
-    # Make the API request
-    response = requests.post(
+    # Make the API request on the shared, pooled HTTP client
+    async with get_session().post(
         "https://picnicinvestimentos.com/api/get-portfolios", headers=headers, json=data
-    )
+    ) as response:
+        # Make sure the request was successful
+        if response.status != 200:
+            raise Exception(f"Failed to fetch portfolio data: code {response.status}")
 
-    # Make sure the request was successful
-    if response.status_code == 200:
         # Parse the response as JSON
-        portfolios = response.json()["portfolios"]
+        portfolios = (await response.json())["portfolios"]
 
-        # Sort the portfolios by APY in descending order
-        portfolios = sorted(portfolios, key=lambda p: p["apy"], reverse=True)
+    # Sort the portfolios by APY in descending order
+    portfolios = sorted(portfolios, key=lambda p: p["apy"], reverse=True)
 
-        # Format the portfolios and return them as a string
-        portfolios_str = "\n".join(
-            [
-                f"""    > `name`: {p["name"]}, `nftId`: {p["nftId"]}, `apy`: {p["apy"]:.2f}%"""
-                for p in portfolios
-                if not p["name"].startswith("Easy_CT")
-            ]
-        )
+    # Format the portfolios and return them as a string
+    portfolios_str = "\n".join(
+        [
+            f"""    > `name`: {p["name"]}, `nftId`: {p["nftId"]}, `apy`: {p["apy"]:.2f}%"""
+            for p in portfolios
+            if not p["name"].startswith("Easy_CT")
+        ]
+    )
 
-        return portfolios_str
-    else:
-        return "Failed to fetch portfolio data"
+    return portfolios_str
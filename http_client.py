@@ -0,0 +1,124 @@
+import aiohttp
+import aiohttp_retry
+
+# Retry transient failures (throttling and server errors) with exponential backoff
+RETRY_ATTEMPTS = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# How long idle connections are kept open for reuse, in seconds
+KEEPALIVE_TIMEOUT = 60
+
+# Default timeout for a request, in seconds
+DEFAULT_TIMEOUT = 60
+
+# Default connection pool limits, overridable through open_session
+DEFAULT_POOL_LIMIT = 100
+DEFAULT_POOL_LIMIT_PER_HOST = 10
+
+_client_session = None
+_session = None
+
+# Connection counters, shared by every session opened by this module
+_stats = {
+    "requests": 0,
+    "connections_created": 0,
+    "connections_reused": 0,
+}
+
+
+async def _on_request_start(session, context, params):
+    _stats["requests"] += 1
+
+
+async def _on_connection_create_end(session, context, params):
+    _stats["connections_created"] += 1
+
+
+async def _on_connection_reuseconn(session, context, params):
+    _stats["connections_reused"] += 1
+
+
+def open_session(limit=DEFAULT_POOL_LIMIT, limit_per_host=DEFAULT_POOL_LIMIT_PER_HOST):
+    """
+    Open the shared HTTP client, if it is not open already.
+
+    The client keeps connections alive between requests and retries
+    throttled and failed requests, so every caller shares one warm pool
+    instead of paying DNS, TCP and TLS handshakes on each call. It must be
+    opened from within the running event loop.
+
+    Args:
+        limit (int, optional): The maximum number of open connections. Defaults to 100.
+        limit_per_host (int, optional): The maximum number of open connections per host. Defaults to 10.
+
+    Returns:
+        aiohttp_retry.RetryClient: The shared HTTP client.
+    """
+
+    global _client_session, _session
+
+    if _session is None or _client_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(_on_request_start)
+        trace_config.on_connection_create_end.append(_on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+        _client_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT),
+            trace_configs=[trace_config],
+        )
+        retry_options = aiohttp_retry.ExponentialRetry(
+            attempts=RETRY_ATTEMPTS,
+            statuses=RETRY_STATUSES,
+            exceptions={aiohttp.ClientError},
+        )
+        _session = aiohttp_retry.RetryClient(
+            client_session=_client_session, retry_options=retry_options
+        )
+    return _session
+
+
+def get_session():
+    """
+    Get the shared HTTP client, opening it with the default limits if needed.
+
+    Returns:
+        aiohttp_retry.RetryClient: The shared HTTP client.
+    """
+
+    if _session is None or _client_session.closed:
+        return open_session()
+    return _session
+
+
+async def close_session():
+    """
+    Close the shared HTTP client and its connections, if it was opened.
+    """
+
+    global _client_session, _session
+
+    if _session is not None:
+        await _session.close()
+        _client_session = None
+        _session = None
+
+
+def connection_stats():
+    """
+    Get the connection counters of the shared HTTP client.
+
+    Returns:
+        dict: The number of requests made, connections created and connections
+        reused, plus the share of requests that rode an already open connection.
+    """
+
+    stats = dict(_stats)
+    total = stats["connections_created"] + stats["connections_reused"]
+    stats["reuse_ratio"] = stats["connections_reused"] / total if total else 0.0
+    return stats
@@ -0,0 +1,43 @@
+import os
+import json
+
+
+def load_json_state(path, default):
+    """
+    Load a JSON state file.
+
+    Args:
+        path (str): The path of the state file.
+        default: The state to use when the file is missing or unreadable.
+
+    Returns:
+        The loaded state, or `default`.
+    """
+
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except ValueError as e:
+        print(f"Ignoring unreadable state file {path}: {e}")
+        return default
+
+
+def save_json_state(path, state):
+    """
+    Persist a JSON state file, replacing it atomically so a crash mid-write
+    never leaves a truncated file behind.
+
+    Args:
+        path (str): The path of the state file.
+        state: The JSON-serializable state.
+    """
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,276 @@
+import asyncio
+from json_state import load_json_state, save_json_state
+
+# Provider errors meaning a log range holds too many blocks or logs, which
+# are fetched in smaller ranges instead of retried
+RANGE_ERROR_MARKERS = (
+    "block range",
+    "range too large",
+    "range is too large",
+    "response size",
+    "more than",
+    "too many results",
+    "exceed maximum block range",
+)
+
+
+class LogIngestor:
+    """
+    Ingest the events of a contract by polling `eth_getLogs` over block ranges.
+
+    A single `eth_getLogs` call covers every event of the contract ABI for a
+    whole block range, instead of one filter per event. The range shrinks
+    when the provider rejects it (too many results or too wide a range) and
+    grows back after successful calls, staying below the last rejected size.
+    Other errors, like throttling, end the poll and are retried on the next
+    one. The last handled block and log are checkpointed, so a restart
+    resumes without gaps or duplicates.
+    """
+
+    def __init__(
+        self,
+        web3,
+        contract,
+        handler,
+        checkpoint_path,
+        start_block=None,
+        confirmations=3,
+        initial_range=100,
+        max_range=2000,
+        poll_interval=2,
+    ):
+        """
+        Args:
+            web3: The AsyncWeb3 instance.
+            contract: The contract whose events are ingested.
+            handler: A coroutine function called with each decoded event, in chain order.
+            checkpoint_path (str): The JSON file the ingestion progress is persisted to.
+            start_block (int, optional): The first block to ingest when there is no checkpoint. Defaults to the chain head.
+            confirmations (int, optional): How many blocks behind the head to stay, to avoid reorged logs. Defaults to 3.
+            initial_range (int, optional): The initial number of blocks per `eth_getLogs` call. Defaults to 100.
+            max_range (int, optional): The maximum number of blocks per `eth_getLogs` call. Defaults to 2000.
+            poll_interval (int, optional): The time to wait between polls once caught up, in seconds. Defaults to 2.
+        """
+
+        self.web3 = web3
+        self.contract = contract
+        self.handler = handler
+        self.checkpoint_path = checkpoint_path
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.range_size = initial_range
+        self.max_range = max_range
+        self.range_ceiling = None  # smallest range the provider rejected
+        self.poll_interval = poll_interval
+        self.events_by_topic = build_events_by_topic(contract)
+        self.next_block = None
+        self.last_position = None
+
+    def load_checkpoint(self):
+        """
+        Restore the ingestion progress from the checkpoint file, if any.
+        """
+
+        checkpoint = load_json_state(self.checkpoint_path, {})
+        if "block" in checkpoint:
+            self.next_block = checkpoint["block"] + 1
+        if checkpoint.get("position") is not None:
+            self.last_position = tuple(checkpoint["position"])
+
+    def save_checkpoint(self, block):
+        """
+        Persist the ingestion progress.
+
+        Args:
+            block (int): The last block whose logs were all handled.
+        """
+
+        save_json_state(
+            self.checkpoint_path,
+            {"block": block, "position": self.last_position},
+        )
+
+    async def fetch_logs(self, from_block, to_block):
+        """
+        Fetch the logs of every contract event in a block range.
+
+        Args:
+            from_block (int): The first block of the range.
+            to_block (int): The last block of the range.
+
+        Returns:
+            list: The raw logs, in chain order.
+        """
+
+        return await fetch_contract_logs(
+            self.web3,
+            self.contract.address,
+            self.events_by_topic.keys(),
+            from_block,
+            to_block,
+        )
+
+    def decode_log(self, log):
+        """
+        Decode a raw log with the contract ABI.
+
+        Args:
+            log: The raw log.
+
+        Returns:
+            The decoded event, or None if the log can't be decoded.
+        """
+
+        return decode_log(self.events_by_topic, log)
+
+    async def handle_logs(self, logs, to_block):
+        """
+        Decode and handle the logs of a block range, then checkpoint it.
+
+        Args:
+            logs (list): The raw logs of the range, in chain order.
+            to_block (int): The last block of the range.
+        """
+
+        for log in logs:
+            position = (log["blockNumber"], log["logIndex"])
+            # Skip logs handled before a restart in the middle of a range
+            if self.last_position is not None and position <= self.last_position:
+                continue
+            event = self.decode_log(log)
+            if event is not None:
+                await self.handler(event)
+            self.last_position = position
+            self.save_checkpoint(log["blockNumber"] - 1)
+        self.save_checkpoint(to_block)
+
+    async def poll_once(self):
+        """
+        Ingest every block range between the last checkpoint and the head.
+        """
+
+        head = await self.web3.eth.block_number - self.confirmations
+        if self.next_block is None:
+            self.next_block = self.start_block if self.start_block is not None else head
+
+        while self.next_block <= head:
+            to_block = min(self.next_block + self.range_size - 1, head)
+            try:
+                logs = await self.fetch_logs(self.next_block, to_block)
+            except Exception as e:
+                if not is_range_error(e) or to_block == self.next_block:
+                    raise
+                # The provider rejected the range, retry it in smaller pieces
+                # and don't grow back to the rejected size
+                rejected = to_block - self.next_block + 1
+                self.range_ceiling = min(self.range_ceiling or rejected, rejected)
+                self.range_size = max(1, rejected // 2)
+                print(f"Shrinking log range to {self.range_size} blocks: {e}")
+                continue
+
+            await self.handle_logs(logs, to_block)
+            self.next_block = to_block + 1
+            range_size = min(self.max_range, self.range_size * 2)
+            if self.range_ceiling is not None:
+                # Bisect towards the rejected size instead of doubling into it
+                range_size = min(
+                    range_size, (self.range_size + self.range_ceiling) // 2
+                )
+            self.range_size = max(self.range_size, range_size)
+
+    async def run(self):
+        """
+        Ingest new events forever.
+        """
+
+        self.load_checkpoint()
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                print(f"Error occurred in log ingestion: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+
+def is_range_error(error):
+    """
+    Check if a provider error means a log range holds too many blocks or logs.
+
+    Args:
+        error (Exception): The error raised fetching the logs.
+
+    Returns:
+        bool: Whether splitting the range can make it succeed.
+    """
+
+    message = str(error).lower()
+    return any(marker in message for marker in RANGE_ERROR_MARKERS)
+
+
+def build_events_by_topic(contract):
+    """
+    Map the topic of each event in a contract ABI to its event object.
+
+    Args:
+        contract: The contract.
+
+    Returns:
+        dict: The event objects, keyed by their topic as bytes.
+    """
+
+    from eth_utils import event_abi_to_log_topic
+
+    return {
+        bytes(event_abi_to_log_topic(abi)): contract.events[abi["name"]]()
+        for abi in contract.abi
+        if abi["type"] == "event"
+    }
+
+
+async def fetch_contract_logs(web3, address, topics, from_block, to_block):
+    """
+    Fetch the logs of a contract matching any of the given event topics.
+
+    Args:
+        web3: The AsyncWeb3 instance.
+        address (str): The contract address.
+        topics: The event topics, as bytes.
+        from_block (int): The first block of the range.
+        to_block (int): The last block of the range.
+
+    Returns:
+        list: The raw logs, in chain order.
+    """
+
+    logs = await web3.eth.get_logs(
+        {
+            "address": address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            # A list in the first position matches any of the event topics
+            "topics": [["0x" + topic.hex() for topic in topics]],
+        }
+    )
+    return sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+
+
+def decode_log(events_by_topic, log):
+    """
+    Decode a raw log with the event matching its topic.
+
+    Args:
+        events_by_topic (dict): The event objects, keyed by their topic as bytes.
+        log: The raw log.
+
+    Returns:
+        The decoded event, or None if the log can't be decoded.
+    """
+
+    event = events_by_topic.get(bytes(log["topics"][0]))
+    if event is None:
+        return None
+    try:
+        return event.process_log(log)
+    except Exception as e:
+        print(f"Error occurred decoding log {log['transactionHash'].hex()}: {e}")
+        return None
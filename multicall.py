@@ -0,0 +1,83 @@
+import json
+
+# Multicall3, deployed at the same address on Polygon and most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# Load Multicall3 ABI from local file
+with open("lib/multicall3_abi.json") as f:
+    MULTICALL3_ABI = json.load(f)
+
+
+def get_multicall(web3):
+    """
+    Get the Multicall3 contract, for a Web3 or AsyncWeb3 instance.
+
+    Args:
+        web3: The Web3 or AsyncWeb3 instance.
+
+    Returns:
+        The Multicall3 contract.
+    """
+
+    return web3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+
+
+def encode_call(contract_function, allow_failure=True):
+    """
+    Encode a contract function call as a Multicall3 `aggregate3` call.
+
+    Args:
+        contract_function: The contract function, with its arguments bound.
+        allow_failure (bool, optional): Whether the batch goes on if this call reverts. Defaults to True.
+
+    Returns:
+        tuple: The target address, the allow failure flag and the call data.
+    """
+
+    return (
+        contract_function.address,
+        allow_failure,
+        contract_function._encode_transaction_data(),
+    )
+
+
+def decode_result(contract_function, result):
+    """
+    Decode the result of a call made through Multicall3 `aggregate3`.
+
+    Args:
+        contract_function: The contract function the call was encoded from.
+        result (tuple): The success flag and return data of the call.
+
+    Returns:
+        tuple: The decoded outputs of the function.
+
+    Raises:
+        ValueError: If the call reverted.
+    """
+
+    from eth_abi import decode
+    from eth_utils.abi import collapse_if_tuple
+
+    success, return_data = result
+    if not success:
+        raise ValueError(
+            f"Call to {contract_function.fn_name} reverted: 0x{bytes(return_data).hex()}"
+        )
+    output_types = [collapse_if_tuple(output) for output in contract_function.abi["outputs"]]
+    return decode(output_types, bytes(return_data))
+
+
+def chunked(items, size):
+    """
+    Split a list into consecutive chunks.
+
+    Args:
+        items (list): The items.
+        size (int): The maximum number of items per chunk.
+
+    Returns:
+        list: The chunks.
+    """
+
+    return [items[i : i + size] for i in range(0, len(items), size)]
@@ -0,0 +1,204 @@
+import time
+import asyncio
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: allows bursts of up to `capacity` operations,
+    refilled at `rate` operations per second.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate (float): The number of tokens added per second.
+            capacity (int): The maximum number of tokens in the bucket.
+        """
+
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        """
+        Take a token, waiting for one to be refilled if the bucket is empty.
+
+        Returns:
+            float: The time waited, in seconds.
+        """
+
+        waited = 0
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+            delay = (1 - self.tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+class DigestNotifier:
+    """
+    Outbound queue coalescing notifications into digest messages.
+
+    Notifications received within `window` seconds of the first pending one
+    are packed into as few messages as the character limit allows, and the
+    messages are sent through a token bucket to stay under the Discord rate
+    limits. The queue is bounded, so producers wait (backpressure) instead of
+    piling up notifications when delivery falls behind.
+    """
+
+    def __init__(
+        self,
+        send,
+        header="",
+        window=5,
+        limit=2000,
+        rate=1,
+        burst=5,
+        max_pending=1000,
+    ):
+        """
+        Args:
+            send: A coroutine function sending one message.
+            header (str, optional): The text starting every digest. Defaults to "".
+            window (float, optional): How long notifications are collected before a digest is sent, in seconds. Defaults to 5.
+            limit (int, optional): The maximum length of a message. Defaults to 2000.
+            rate (float, optional): The number of messages sent per second, sustained. Defaults to 1.
+            burst (int, optional): The number of messages that can be sent at once. Defaults to 5.
+            max_pending (int, optional): The maximum number of queued notifications. Defaults to 1000.
+        """
+
+        self.send = send
+        self.header = header
+        self.window = window
+        self.limit = limit
+        self.bucket = TokenBucket(rate, burst)
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.stats = {
+            "notifications": 0,
+            "digests": 0,
+            "messages": 0,
+            "max_pending": 0,
+            "producer_wait": 0.0,
+            "rate_limit_wait": 0.0,
+        }
+
+    async def put(self, notification):
+        """
+        Queue a notification, waiting while the queue is full.
+
+        Args:
+            notification (str): The notification text.
+        """
+
+        started_at = time.monotonic()
+        await self.queue.put(notification)
+        self.stats["producer_wait"] += time.monotonic() - started_at
+        self.stats["notifications"] += 1
+        self.stats["max_pending"] = max(self.stats["max_pending"], self.queue.qsize())
+
+    async def collect(self):
+        """
+        Wait for a notification, then collect the others arriving within the window.
+
+        Returns:
+            list: The collected notifications.
+        """
+
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while True:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def split(self, notification):
+        """
+        Split a notification into pieces fitting a message with their newline.
+
+        A notification over the limit is cut at its line breaks, and lines
+        still over the limit are cut by characters. Blank pieces are dropped.
+
+        Args:
+            notification (str): The notification text.
+
+        Returns:
+            list: The pieces, of at most `limit - 1` characters each.
+        """
+
+        size = self.limit - 1
+        if len(notification) <= size:
+            return [notification] if notification.strip() else []
+        return [
+            line[start : start + size]
+            for line in notification.split("\n")
+            for start in range(0, len(line), size)
+            if line[start : start + size].strip()
+        ]
+
+    def pack(self, notifications):
+        """
+        Pack notifications into as few messages as the character limit allows.
+
+        Args:
+            notifications (list): The notification texts.
+
+        Returns:
+            list: The messages, the first one starting with the header. None
+            is empty or over the limit.
+        """
+
+        messages = []
+        current = self.header
+        for notification in notifications:
+            for piece in self.split(notification):
+                if len(current) + len(piece) + 1 > self.limit:
+                    if current.strip():
+                        messages.append(current)
+                    current = ""
+                current += piece + "\n"
+        if current.strip():
+            messages.append(current)
+        return messages
+
+    async def flush(self, notifications):
+        """
+        Send the notifications as digest messages, respecting the rate limit.
+
+        Args:
+            notifications (list): The notification texts.
+        """
+
+        self.stats["digests"] += 1
+        for message in self.pack(notifications):
+            self.stats["rate_limit_wait"] += await self.bucket.acquire()
+            await self.send(message)
+            self.stats["messages"] += 1
+
+    async def run(self):
+        """
+        Deliver queued notifications forever.
+        """
+
+        while True:
+            notifications = await self.collect()
+            try:
+                await self.flush(notifications)
+            except Exception as e:
+                print(f"Error occurred sending notifications: {e}")
+            print(
+                f"Sent digest of {len(notifications)} notifications, "
+                f"{self.queue.qsize()} pending, stats: {self.stats}"
+            )
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    timestamp INTEGER NOT NULL,
+    connector TEXT NOT NULL,
+    token0 TEXT NOT NULL,
+    token1 TEXT NOT NULL,
+    amount_usd REAL NOT NULL,
+    amount REAL NOT NULL,
+    quote REAL,
+    quote_rate REAL,
+    base_rate REAL NOT NULL,
+    comparison REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS quotes_series ON quotes (token0, token1, timestamp);
+"""
+
+
+class QuoteStore:
+    """
+    Append-only SQLite time series of liquidity checks: one row per quote,
+    with its rate and its deviation from the base rate at that time.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The path of the SQLite database.
+        """
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def append(self, timestamp, report):
+        """
+        Store the quotes of a liquidity report, in one transaction.
+
+        Args:
+            timestamp (int): The time of the check, as a Unix timestamp.
+            report: The LiquidityReport of the check.
+        """
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO quotes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        timestamp,
+                        result.connector,
+                        report.token0.symbol,
+                        report.token1.symbol,
+                        result.amount_usd,
+                        result.amount,
+                        result.quote,
+                        result.quote_rate,
+                        report.base_rate,
+                        result.comparison,
+                        result.error,
+                    )
+                    for result in report.results
+                ],
+            )
+
+    def rolling(self, token0, token1, since):
+        """
+        Aggregate the quotes of a pair since a given time, per connector and size.
+
+        Args:
+            token0 (str): The symbol of the input token.
+            token1 (str): The symbol of the output token.
+            since (int): The start of the window, as a Unix timestamp.
+
+        Returns:
+            list: A dict per connector and USD amount, with the number of checks,
+            the error rate, the average and latest deviation from the base rate
+            and the largest absolute deviation, in %.
+        """
+
+        rows = self.connection.execute(
+            """
+            SELECT
+                connector,
+                amount_usd,
+                COUNT(*),
+                AVG(error IS NOT NULL),
+                AVG(comparison),
+                MAX(ABS(comparison)),
+                (
+                    SELECT latest.comparison FROM quotes AS latest
+                    WHERE latest.token0 = quotes.token0
+                    AND latest.token1 = quotes.token1
+                    AND latest.connector = quotes.connector
+                    AND latest.amount_usd = quotes.amount_usd
+                    ORDER BY latest.timestamp DESC LIMIT 1
+                )
+            FROM quotes
+            WHERE token0 = ? AND token1 = ? AND timestamp >= ?
+            GROUP BY connector, amount_usd
+            ORDER BY connector, amount_usd
+            """,
+            (token0, token1, since),
+        )
+        return [
+            {
+                "connector": connector,
+                "amount_usd": amount_usd,
+                "checks": checks,
+                "error_rate": error_rate,
+                "avg_comparison": avg_comparison,
+                "max_deviation": max_deviation,
+                "last_comparison": last_comparison,
+            }
+            for (
+                connector,
+                amount_usd,
+                checks,
+                error_rate,
+                avg_comparison,
+                max_deviation,
+                last_comparison,
+            ) in rows
+        ]
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+
+        self.connection.close()
@@ -1,66 +1,44 @@
 import os
 import json
+import time
+import random
 import requests
-from web3 import Web3
-from eth_abi.packed import encode_packed
-from itertools import permutations
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from uniswap_v3 import PoolState, NotEnoughLiquidityError, OutsideSnapshotError
+from multicall import get_multicall, encode_call, decode_result, chunked
+from fx_rates import fx_rates
+from token_registry import registry, Token
 
 # URL for Alchemy API
 ALCHEMY_URL = f'https://polygon-mainnet.g.alchemy.com/v2/{os.getenv("ALCHEMY_API_KEY")}'
 
-w3 = Web3(Web3.HTTPProvider(ALCHEMY_URL))
-w3.is_connected()
-
-# Tokens info
-brla_token = {
-    "address": "0xE6A537a407488807F0bbeb0038B79004f19DDDFb",
-    "symbol": "BRLA",
-    "name": "BRLA Token",
-    "currency": "BRL",
-    "decimals": 18,
-    "default_amount": 5000,
-}
-usdc_token = {
-    "address": "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174",
-    "symbol": "USDC",
-    "name": "USD Coin (POS)",
-    "currency": "USD",
-    "decimals": 6,
-    "default_amount": 1000,
-}
-brz_token_old = {
-    "address": "0x491a4eB4f1FC3BfF8E1d2FC856a6A46663aD556f",
-    "symbol": "BRZ (old)",
-    "name": "BRZ Token",
-    "currency": "BRL",
-    "decimals": 4,
-    "default_amount": 5000,
-}
-brz_token = {
-    "address": "0x4eD141110F6EeeAbA9A1df36d8c26f684d2475Dc",
-    "symbol": "BRZ",
-    "name": "BRZ Token",
-    "currency": "BRL",
-    "decimals": 18,
-    "default_amount": 5000,
-}
-weth_token = {
-    "address": "0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619",
-    "symbol": "WETH",
-    "name": "Wrapped Ether",
-    "currency": "ETH",
-    "decimals": 18,
-    "default_amount": 0.5,
-}
+# Web3 provider, created on first use so importing this module stays cheap
+_web3 = None
+_web3_lock = threading.Lock()
 
-# make the following tokens as one object of tokens
-tokens = {
-    "BRLA": brla_token,
-    "USDC": usdc_token,
-    # "BRZ_OLD": brz_token_old,
-    "BRZ": brz_token,
-    "WETH": weth_token,
-}
+
+def get_web3():
+    global _web3
+    with _web3_lock:
+        if _web3 is None:
+            from web3 import Web3
+
+            _web3 = Web3(Web3.HTTPProvider(ALCHEMY_URL))
+        return _web3
+
+
+# Tokens info, from the shared registry
+brla_token = registry["BRLA"]
+usdc_token = registry["USDC"]
+brz_token_old = registry["BRZ_OLD"]
+brz_token = registry["BRZ"]
+weth_token = registry["WETH"]
+
+# make the quoted tokens as one object of tokens
+tokens = registry.quoted()
 
 # building token pair
 pairs = []
@@ -77,60 +55,234 @@ def display_progress_bar(iteration, total, bar_length=50):
     print(f"\r[{arrow + spaces}] {int(progress * 100)}%", end="", flush=True)
 
 
-def build_arbitrage_routes(tokens):
+def build_token_graph(tokens, liquid_pairs=None):
+    # Adjacency lists of the token keys; with liquid_pairs, only the listed
+    # (key0, key1) pairs are tradable, in both directions
+    if liquid_pairs is not None:
+        liquid_pairs = {frozenset(pair) for pair in liquid_pairs}
+    return {
+        key0: [
+            key1
+            for key1 in tokens
+            if key1 != key0
+            and (liquid_pairs is None or frozenset((key0, key1)) in liquid_pairs)
+        ]
+        for key0 in tokens
+    }
+
+
+def build_arbitrage_routes(tokens, max_length=4, min_length=3, liquid_pairs=None):
+    # Enumerate each directed simple cycle of min_length to max_length tokens
+    # exactly once: a cycle is only walked from its first token in `tokens`
+    # order, which drops rotations and duplicates
+    graph = build_token_graph(tokens, liquid_pairs)
+    order = {key: index for index, key in enumerate(tokens)}
     routes = []
-    for token1 in tokens.values():
-        # Generate all possible routes starting and ending with token1
-        other_tokens = [token for token in tokens.values() if token != token1]
-        for perm in permutations(other_tokens):
-            route = [token1] + list(perm) + [token1]
-
-            # Only append routes with 4 or more tokens
-            if len(route) >= 4:
-                routes.append(route)
-
-            # Generate sub-routes
-            for i in range(2, len(route)):
-                for j in range(len(route) - i + 1):
-                    sub_route = route[j : j + i]
-
-                    # Only append sub-routes with 4 or more tokens
-                    if (
-                        sub_route and len(sub_route) + 1 >= 4
-                    ):  # +1 for the closing token
-                        # Close the loop for the sub-route
-                        sub_route.append(sub_route[0])
-                        routes.append(sub_route)
 
+    def extend(path):
+        for key in graph[path[-1]]:
+            if key == path[0] and len(path) >= min_length:
+                routes.append([tokens[k] for k in path] + [tokens[path[0]]])
+            elif order[key] > order[path[0]] and key not in path and len(path) < max_length:
+                extend(path + [key])
+
+    for start in tokens:
+        extend([start])
     return routes
 
 
-arbitrage_routes = build_arbitrage_routes(tokens)
+# Routes between the quoted tokens, built on first use
+_arbitrage_routes = None
+
+
+def get_arbitrage_routes():
+    global _arbitrage_routes
+    if _arbitrage_routes is None:
+        _arbitrage_routes = build_arbitrage_routes(tokens)
+    return _arbitrage_routes
+
 
 # Quickswap's quoter address
 QUOTER_ADDRESS = "0xa15F0D7377B2A0C0c10db057f641beD21028FC89"
 
+# Quickswap's (Algebra) pool factory address and pools tick spacing
+QUICKSWAP_FACTORY_ADDRESS = "0x411b0fAcC3489691f28ad58c47006AF5E3Ab3A28"
+QUICKSWAP_TICK_SPACING = 60
+
+# Polygon block time, in seconds
+BLOCK_TIME = 2
+
+# Load Quickswap (Algebra) ABIs from local files
+with open("lib/algebra_factory_abi.json") as f:
+    ALGEBRA_FACTORY_ABI = json.load(f)
+with open("lib/algebra_pool_abi.json") as f:
+    ALGEBRA_POOL_ABI = json.load(f)
+with open("lib/quickswap_quoter_abi.json") as f:
+    QUICKSWAP_QUOTER_ABI = json.load(f)
+
+
+class QuoteError(ValueError):
+    pass
+
+
+class InsufficientLiquidityError(QuoteError):
+    pass
+
+
+class RateLimitedError(QuoteError):
+    pass
+
+
+class QuoteServiceError(QuoteError):
+    # The quoting service failed or answered something unexpected
+    pass
+
+
+class SimulationRangeError(QuoteError):
+    # The swap goes beyond the pool state known to a simulator, which says
+    # nothing about the pool's liquidity
+    pass
+
+
+# Kinds of failed quotes, so throttling and timeouts aren't reported as
+# missing liquidity
+LIQUIDITY_ERROR = "liquidity"
+RATE_LIMITED_ERROR = "rate_limited"
+SERVICE_ERROR = "service"
+TIMEOUT_ERROR = "timeout"
+SIMULATION_RANGE_ERROR = "simulation_range"
+OTHER_ERROR = "error"
+
+
+def error_kind(error):
+    if isinstance(error, InsufficientLiquidityError):
+        return LIQUIDITY_ERROR
+    if isinstance(error, RateLimitedError):
+        return RATE_LIMITED_ERROR
+    if isinstance(error, QuoteServiceError):
+        return SERVICE_ERROR
+    if isinstance(error, TimeoutError):
+        return TIMEOUT_ERROR
+    if isinstance(error, SimulationRangeError):
+        return SIMULATION_RANGE_ERROR
+    return OTHER_ERROR
+
 
 class QuoteConnector:
+    # Whether get_quotes quotes a whole batch at once, cheaper than get_quote
+    # for each of its jobs
+    BATCHED = False
+
     def get_quote(self, token0, token1, amount):
         raise NotImplementedError
 
+    def get_quotes(self, jobs, **kwargs):
+        # Quotes every (token0, token1, amount) job, returning in the same
+        # order the quote or the exception raised for each
+        quotes = []
+        for token0, token1, amount in jobs:
+            try:
+                quotes.append(self.get_quote(token0, token1, amount, **kwargs))
+            except Exception as e:
+                quotes.append(e)
+        return quotes
+
     def get_name(self):
         return self.__class__.__name__
 
+    def queue_time(self, count):
+        # Time `count` quotes may wait for a rate limit before being sent, in
+        # seconds, added to the engine timeout of a batch
+        return 0
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: allows bursts of up to `burst` calls, refilled
+    at `rate` calls per second.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
 
 class ParaswapConnector(QuoteConnector):
     BASE_URL = "https://apiv5.paraswap.io"
+    TIMEOUT = 10  # seconds
+    RATE = 2  # requests per second, sustained, under the public API quota
+    BURST = 5
+    MAX_RETRIES = 3
+    BACKOFF = 0.5  # seconds, doubled on every retry
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, rate=RATE, burst=BURST):
+        # Keep-alive connections, one per concurrent quote
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=16)
+        self.session.mount("https://", adapter)
+        self.rate_limiter = RateLimiter(rate, burst)
+
+    def queue_time(self, count):
+        return max(0, count - self.rate_limiter.burst) / self.rate_limiter.rate
+
+    def request(self, endpoint, params):
+        # GET with rate limiting, retrying with jittered exponential backoff on
+        # throttling, server errors and connection errors
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(
+                    self.BASE_URL + endpoint, params=params, timeout=self.TIMEOUT
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = QuoteServiceError(f"Paraswap request failed: {e}")
+                delay = None
+            else:
+                if response.status_code not in self.RETRY_STATUSES:
+                    return response
+                if response.status_code == 429:
+                    error = RateLimitedError("Paraswap rate limit exceeded")
+                else:
+                    error = QuoteServiceError(
+                        f"Paraswap server error: {response.status_code}"
+                    )
+                delay = response.headers.get("Retry-After")
+
+            if attempt == self.MAX_RETRIES:
+                raise error
+            try:
+                delay = float(delay)
+            except (TypeError, ValueError):
+                delay = random.uniform(0, self.BACKOFF * 2**attempt)
+            time.sleep(delay)
 
     def get_quote(self, token0, token1, amount, **kwargs):
         endpoint = "/prices"
 
         # Prepare the request payload
         params = {
-            "srcToken": token0["address"],
-            "srcDecimals": token0["decimals"],
-            "destToken": token1["address"],
-            "destDecimals": token1["decimals"],
+            "srcToken": token0.address,
+            "srcDecimals": token0.decimals,
+            "destToken": token1.address,
+            "destDecimals": token1.decimals,
             "amount": amount,
             "side": kwargs.get("side", "SELL"),  # Default to "SELL"
             "network": kwargs.get("network", "137"),  # Default to "Mainnet"
@@ -140,234 +292,930 @@ class ParaswapConnector(QuoteConnector):
         # Removing None values
         params = {k: v for k, v in params.items() if v is not None}
 
-        response = requests.get(self.BASE_URL + endpoint, params=params)
-        data = response.json()
-        # print("oi", response)
+        response = self.request(endpoint, params)
+        try:
+            data = response.json()
+        except ValueError:
+            raise QuoteServiceError(
+                f"Invalid response from Paraswap: {response.status_code} {response.text[:200]}"
+            )
 
         # Verify the successful response structure and extract the destination amount
         if "priceRoute" in data and "destAmount" in data["priceRoute"]:
             return data["priceRoute"]["destAmount"]
-        else:
-            raise ValueError(f"Unexpected response format from Paraswap: {data}")
+        if response.status_code == 400 and "error" in data:
+            # No route or too much price impact for this amount
+            raise InsufficientLiquidityError(f"Paraswap: {data['error']}")
+        raise QuoteServiceError(f"Unexpected response format from Paraswap: {data}")
+
+
+class QuickswapSimulatorConnector(QuoteConnector):
+    """
+    Quotes Quickswap V3 swaps locally: the pool state (price, liquidity and
+    the initialized ticks around the price) is snapshotted once per block,
+    then every quote on that block is computed with the exact pool math,
+    without any RPC call.
+    """
+
+    def __init__(self, web3=None, words=2):
+        self.web3 = web3 or get_web3()
+        self.words = words  # tick bitmap words snapshotted on each side of the price
+        self.factory = self.web3.eth.contract(
+            address=QUICKSWAP_FACTORY_ADDRESS, abi=ALGEBRA_FACTORY_ABI
+        )
+        self.pools = {}
+        self.snapshots = {}  # latest (block, PoolState) of each pool
+        self.block = None
+        self.block_checked_at = 0
+        self.lock = threading.Lock()
+
+    def current_block(self):
+        # Polls the block number at most once per block time
+        if time.monotonic() - self.block_checked_at > BLOCK_TIME:
+            self.block = self.web3.eth.block_number
+            self.block_checked_at = time.monotonic()
+        return self.block
+
+    def get_pool(self, token0, token1):
+        pair = frozenset((token0.address, token1.address))
+        if pair not in self.pools:
+            pool_address = self.factory.functions.poolByPair(
+                token0.address, token1.address
+            ).call()
+            if int(pool_address, 16) == 0:
+                raise InsufficientLiquidityError(
+                    f"No Quickswap pool for {token0.symbol}-{token1.symbol}"
+                )
+            self.pools[pair] = self.web3.eth.contract(
+                address=pool_address, abi=ALGEBRA_POOL_ABI
+            )
+        return self.pools[pair]
+
+    def snapshot(self, pool, block):
+        price, tick, fee, *_ = pool.functions.globalState().call(
+            block_identifier=block
+        )
+        liquidity = pool.functions.liquidity().call(block_identifier=block)
+        word = (tick // QUICKSWAP_TICK_SPACING) >> 8
+        word_range = (word - self.words, word + self.words)
+
+        liquidity_net = {}
+        for word_position in range(word_range[0], word_range[1] + 1):
+            bitmap = pool.functions.tickTable(word_position).call(
+                block_identifier=block
+            )
+            for bit in range(256):
+                if bitmap >> bit & 1:
+                    initialized_tick = ((word_position << 8) + bit) * QUICKSWAP_TICK_SPACING
+                    liquidity_net[initialized_tick] = pool.functions.ticks(
+                        initialized_tick
+                    ).call(block_identifier=block)[1]
+
+        return PoolState(
+            price,
+            tick,
+            liquidity,
+            fee,
+            QUICKSWAP_TICK_SPACING,
+            liquidity_net,
+            word_range,
+        )
+
+    def get_pool_state(self, pool, block):
+        with self.lock:
+            cached = self.snapshots.get(pool.address)
+            if cached is None or cached[0] != block:
+                self.snapshots[pool.address] = (block, self.snapshot(pool, block))
+            return self.snapshots[pool.address][1]
+
+    def get_quote(self, token0, token1, amount, block=None, **kwargs):
+        pool = self.get_pool(token0, token1)
+        state = self.get_pool_state(pool, block or self.current_block())
+        # Pools order their tokens by address
+        zero_for_one = int(token0.address, 16) < int(token1.address, 16)
+        try:
+            return state.quote_exact_input(int(amount), zero_for_one)
+        except NotEnoughLiquidityError as e:
+            raise InsufficientLiquidityError(str(e)) from e
+        except OutsideSnapshotError as e:
+            raise SimulationRangeError(str(e)) from e
+
+
+def encode_path(route):
+    from eth_abi.packed import encode_packed
+
+    # Quickswap (Algebra) paths are the packed token addresses, without fees
+    return encode_packed(["address"] * len(route), [token.address for token in route])
+
+
+class QuickswapMulticallConnector(QuoteConnector):
+    """
+    Quotes through the Quickswap quoter, packing many quoteExactInput calls
+    into each Multicall3 eth_call. All the quotes of a batch are pinned to
+    the same block.
+    """
+
+    BATCHED = True
+
+    def __init__(self, web3=None, batch_size=100):
+        self.web3 = web3 or get_web3()
+        self.batch_size = batch_size  # quotes per eth_call
+        self.quoter = self.web3.eth.contract(
+            address=QUOTER_ADDRESS, abi=QUICKSWAP_QUOTER_ABI
+        )
+        self.multicall = get_multicall(self.web3)
+        self.block = None
+        self.block_checked_at = 0
+
+    def current_block(self):
+        # Polls the block number at most once per block time
+        if time.monotonic() - self.block_checked_at > BLOCK_TIME:
+            self.block = self.web3.eth.block_number
+            self.block_checked_at = time.monotonic()
+        return self.block
+
+    def quote_paths(self, jobs, block=None):
+        # Quotes every (route, amount) job, a route being a list of tokens,
+        # returning in the same order the quote or the exception for each
+        block = block if block is not None else self.current_block()
+        functions = [
+            self.quoter.functions.quoteExactInput(encode_path(route), int(amount))
+            for route, amount in jobs
+        ]
+        quotes = []
+        for batch in chunked(functions, self.batch_size):
+            results = self.multicall.functions.aggregate3(
+                [encode_call(function) for function in batch]
+            ).call(block_identifier=block)
+            for function, result in zip(batch, results):
+                try:
+                    quotes.append(decode_result(function, result)[0])
+                except ValueError as e:
+                    quotes.append(InsufficientLiquidityError(f"Not enough liquidity: {e}"))
+        return quotes
+
+    def get_quotes(self, jobs, block=None, **kwargs):
+        return self.quote_paths(
+            [([token0, token1], amount) for token0, token1, amount in jobs], block
+        )
+
+    def get_quote(self, token0, token1, amount, block=None, **kwargs):
+        quote = self.get_quotes([(token0, token1, amount)], block)[0]
+        if isinstance(quote, Exception):
+            raise quote
+        return quote
+
+
+class CachedQuoteConnector(QuoteConnector):
+    """
+    LRU cache around another connector's quotes, keyed by (connector, token
+    pair id, amount bucket, block), so the identical quotes of a scan window
+    are served from memory.
+
+    Amounts are bucketed to `precision` significant digits: the connector is
+    asked for the bucket's amount and the quote is scaled back to the amount
+    requested. The block is the one requested or the connector's current
+    block; connectors without blocks are keyed without one. Either way, a
+    quote expires `ttl` seconds after it was fetched.
+    """
+
+    def __init__(self, connector, max_size=4096, precision=4, ttl=BLOCK_TIME):
+        self.connector = connector
+        self.max_size = max_size
+        self.precision = precision
+        self.ttl = ttl  # seconds
+        self.BATCHED = connector.BATCHED
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_name(self):
+        return self.connector.get_name()
+
+    def queue_time(self, count):
+        return self.connector.queue_time(count)
+
+    def get_block(self, block=None):
+        if block is not None:
+            return block
+        if hasattr(self.connector, "current_block"):
+            return self.connector.current_block()
+        return None
+
+    def bucket(self, amount):
+        amount = int(amount)
+        step = 10 ** max(0, len(str(amount)) - self.precision)
+        return max(step, round(amount / step) * step)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.cache:
+                quote, expires_at = self.cache[key]
+                if time.monotonic() < expires_at:
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+                    return quote
+                del self.cache[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, quote):
+        with self.lock:
+            self.cache[key] = (quote, time.monotonic() + self.ttl)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+                self.evictions += 1
+
+    def get_quotes(self, jobs, block=None, **kwargs):
+        block = self.get_block(block)
+        keys = [
+            (self.get_name(), registry.pair_id(token0, token1), self.bucket(amount), block)
+            for token0, token1, amount in jobs
+        ]
+        quotes = [self.get(key) for key in keys]
+
+        # Quote each missing bucket once, errors aren't cached
+        missing = {
+            key: job for key, job, quote in zip(keys, jobs, quotes) if quote is None
+        }
+        if missing:
+            missing_jobs = [
+                (token0, token1, key[2]) for key, (token0, token1, _) in missing.items()
+            ]
+            # Only real blocks are passed on, the connector picks its own otherwise
+            if block is not None:
+                kwargs["block"] = block
+            results = self.connector.get_quotes(missing_jobs, **kwargs)
+            fetched = dict(zip(missing, results))
+            for key, quote in fetched.items():
+                if not isinstance(quote, Exception):
+                    self.put(key, int(quote))
+            quotes = [
+                fetched[key] if quote is None else quote
+                for key, quote in zip(keys, quotes)
+            ]
+
+        return [
+            quote
+            if isinstance(quote, Exception)
+            else int(quote) * int(amount) // key[2]
+            for key, (_, _, amount), quote in zip(keys, jobs, quotes)
+        ]
+
+    def get_quote(self, token0, token1, amount, block=None, **kwargs):
+        quote = self.get_quotes([(token0, token1, amount)], block, **kwargs)[0]
+        if isinstance(quote, Exception):
+            raise quote
+        return quote
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / total if total else 0,
+            }
+
+
+class QuotingEngine:
+    """Issues many quotes concurrently, capping the in-flight quotes per connector."""
+
+    def __init__(self, max_workers=16, per_connector_concurrency=4, timeout=15):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.per_connector_concurrency = per_connector_concurrency
+        self.timeout = timeout  # seconds, for a batch, plus its rate limit queue
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def get_semaphore(self, connector):
+        with self.lock:
+            if connector.get_name() not in self.semaphores:
+                self.semaphores[connector.get_name()] = threading.BoundedSemaphore(
+                    self.per_connector_concurrency
+                )
+            return self.semaphores[connector.get_name()]
+
+    def quote(self, connector, token0, token1, amount, **kwargs):
+        with self.get_semaphore(connector):
+            return connector.get_quote(token0, token1, amount, **kwargs)
+
+    def quote_batch(self, connector, jobs, **kwargs):
+        with self.get_semaphore(connector):
+            return connector.get_quotes(jobs, **kwargs)
+
+    # Quotes every (connector, token0, token1, amount) job concurrently and
+    # returns, in the same order, the quote or the exception raised for each.
+    # Batched connectors get all of their jobs in a single call. The timeout
+    # grows with the time the batch waits for the connectors' rate limits.
+    def quote_many(self, jobs, **kwargs):
+        futures = []
+        batches = {}
+        counts = {}
+        for index, (connector, token0, token1, amount) in enumerate(jobs):
+            if connector.BATCHED:
+                batches.setdefault(connector, []).append(index)
+                futures.append(None)
+            else:
+                counts[connector] = counts.get(connector, 0) + 1
+                futures.append(
+                    self.executor.submit(
+                        self.quote, connector, token0, token1, amount, **kwargs
+                    )
+                )
+        batch_futures = {
+            connector: self.executor.submit(
+                self.quote_batch,
+                connector,
+                [jobs[index][1:] for index in indexes],
+                **kwargs,
+            )
+            for connector, indexes in batches.items()
+        }
+        timeout = self.timeout + max(
+            (connector.queue_time(count) for connector, count in counts.items()),
+            default=0,
+        )
+        wait(
+            [future for future in futures if future is not None]
+            + list(batch_futures.values()),
+            timeout=timeout,
+        )
+
+        results = [self.get_result(future, timeout) for future in futures]
+        for connector, indexes in batches.items():
+            quotes = self.get_result(batch_futures[connector], timeout)
+            for position, index in enumerate(indexes):
+                results[index] = (
+                    quotes if isinstance(quotes, Exception) else quotes[position]
+                )
+        return results
+
+    def get_result(self, future, timeout):
+        if future is None:
+            return None
+        if not future.done():
+            future.cancel()
+            return TimeoutError(f"No quote after {timeout:.0f}s")
+        if future.exception() is not None:
+            return future.exception()
+        return future.result()
+
+
+# Engine shared by every calculator
+quoting_engine = QuotingEngine()
+
+# Deviation from the base rate, in %, above which a quote is flagged
+DEFAULT_THRESHOLD = 1
+
+# Liquidity monitor settings
+LIQUIDITY_STORE_PATH = os.getenv("LIQUIDITY_STORE_PATH", "data/liquidity.sqlite")
+LIQUIDITY_MONITOR_INTERVAL = int(os.getenv("LIQUIDITY_MONITOR_INTERVAL", "300"))
+
+# Slippage bands, in %, the depth curve finds the largest tradable amount for
+DEPTH_BANDS = [0.1, 0.5, 1, 2]
+
+
+# How the failed quotes of each kind are reported
+ERROR_REASONS = {
+    RATE_LIMITED_ERROR: "rate limited",
+    SERVICE_ERROR: "service error",
+    TIMEOUT_ERROR: "timed out",
+    SIMULATION_RANGE_ERROR: "out of simulated range",
+}
+
+
+@dataclass
+class QuoteResult:
+    connector: str
+    amount: float  # in token0 units
+    amount_usd: float = None
+    quote: float = None  # in token1 units
+    quote_rate: float = None
+    comparison: float = None  # deviation from the base rate, in %
+    error: str = None
+    error_kind: str = None  # LIQUIDITY_ERROR, RATE_LIMITED_ERROR, etc.
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def illiquid(self):
+        return self.error_kind == LIQUIDITY_ERROR
+
+
+@dataclass
+class LiquidityReport:
+    token0: Token
+    token1: Token
+    base_rate: float
+    threshold: float = DEFAULT_THRESHOLD
+    results: list = field(default_factory=list)
+
+    def format(self):
+        report = ""
+        for connector in dict.fromkeys(result.connector for result in self.results):
+            report += f"Checking liquidity for connector: {connector}\n"
+            for result in self.results:
+                if result.connector != connector:
+                    continue
+                if result.illiquid:
+                    report += f"Not enough liquidity for {result.amount} {self.token0.symbol}. Error: {result.error}\n"
+                elif not result.ok:
+                    reason = ERROR_REASONS.get(result.error_kind, "failed")
+                    report += f"⚠️ -> Quote {reason} for {result.amount} {self.token0.symbol}. Error: {result.error}\n"
+                elif abs(result.comparison) > self.threshold:
+                    report += f"🔴 -> {result.amount} {self.token0.symbol} = {result.quote:.6f} {self.token1.symbol}, Quote Rate: {result.quote_rate:.3f}, Vs Base Rate: {result.comparison:.3f}%\n"
+                else:
+                    report += f"🟢 -> {result.amount} {self.token0.symbol} = {result.quote:.3f} {self.token1.symbol}, Quote Rate: {result.quote_rate:.3f}, Vs Base Rate: {result.comparison:.3f}%\n"
+        report += "Done!\n"
+        return report
+
+    def __str__(self):
+        return self.format()
+
+    def flagged(self):
+        # Quotes lacking liquidity or deviating from the base rate beyond the
+        # threshold. Quotes that failed otherwise say nothing about liquidity.
+        return [
+            result
+            for result in self.results
+            if result.illiquid
+            or (result.ok and abs(result.comparison) > self.threshold)
+        ]
+
+
+@dataclass
+class DepthPoint:
+    slippage: float  # band, in % below the reference rate
+    amount: float = None  # largest amount within the band, in token0 units
+    amount_usd: float = None
+    quote_rate: float = None
+    bounded: bool = True  # False if even the largest searched amount is within the band
+
+
+@dataclass
+class DepthCurve:
+    connector: str
+    token0: Token
+    token1: Token
+    base_rate: float
+    reference_rate: float = None  # quote rate for the smallest amount
+    points: list = field(default_factory=list)
+    quotes: int = 0  # quotes spent on the search
+    error: str = None
+
+    def to_dict(self):
+        return {
+            "connector": self.connector,
+            "token0": self.token0.symbol,
+            "token1": self.token1.symbol,
+            "base_rate": self.base_rate,
+            "reference_rate": self.reference_rate,
+            "points": [asdict(point) for point in self.points],
+            "quotes": self.quotes,
+            "error": self.error,
+        }
+
+    def format(self):
+        pair = f"{self.token0.symbol}-{self.token1.symbol}"
+        if self.error is not None:
+            return f"No depth curve for {pair} on {self.connector}. Error: {self.error}\n"
+        report = f"Depth curve for {pair} on {self.connector}, Reference Rate: {self.reference_rate:.6f} ({self.quotes} quotes)\n"
+        for point in self.points:
+            if point.amount is None:
+                report += f"🔴 -> {point.slippage}%: no amount within the band\n"
+            else:
+                above = "" if point.bounded else "+"
+                report += f"🟢 -> {point.slippage}%: {point.amount:.3f}{above} {self.token0.symbol} (${point.amount_usd:,.0f}{above}), Quote Rate: {point.quote_rate:.6f}\n"
+        return report
+
+    def __str__(self):
+        return self.format()
 
 
 class LiquidityCalculator:
-    def __init__(self, connectors, token0, token1, base_rate=0):
+    def __init__(
+        self,
+        connectors,
+        token0,
+        token1,
+        base_rate=0,
+        engine=None,
+        rate_provider=None,
+        amounts=None,
+    ):
         self.connectors = connectors
         self.token0 = token0
         self.token1 = token1
-        self.amounts = [100, 1000, 2000, 5000]  # Standardized amounts
+        # Standardized amounts, in USD
+        self.amounts = amounts or [100, 1000, 2000, 5000]
+        self.engine = engine or quoting_engine
+        self.rate_provider = rate_provider or fx_rates
         self.rates = self.get_base_rate()
         try:
             self.base_rate = (
                 base_rate
                 if base_rate != 0
-                else float(self.rates[self.token1["currency"]])
+                else float(self.rates[self.token1.currency])
             )
         except KeyError:
             print(f"Invalid base rate: {base_rate}")
             raise
-        print(f"Starting Liq Calc for {self.token0['symbol']}-{self.token1['symbol']}")
+        print(f"Starting Liq Calc for {self.token0.symbol}-{self.token1.symbol}")
         print(f"Base Rate: {self.base_rate:.8f}")
 
     def get_base_rate(self):
-        base_currency = self.token0["currency"]
-        response = requests.get(
-            f"https://api.coinbase.com/v2/exchange-rates?currency={base_currency}"
+        # Rates of every currency against token0's, from the shared cache
+        return self.rate_provider.get_rates(self.token0.currency)
+
+    def quote_amounts(self, jobs):
+        # Quotes every (connector, amount) job, amounts in token0 units, and
+        # returns in the same order the quote in token1 units or the exception
+        scale0 = self.token0.scale
+        scale1 = self.token1.scale
+        quotes = self.engine.quote_many(
+            [
+                (connector, self.token0, self.token1, int(amount * scale0))
+                for connector, amount in jobs
+            ],
+            network="137",
         )
-        data = response.json()
-        return data["data"]["rates"]
+        return [
+            quote if isinstance(quote, Exception) else int(quote) / scale1
+            for quote in quotes
+        ]
 
     def check_liquidity(self):
-        report = ""
-        for connector in self.connectors:
-            report += f"Checking liquidity for connector: {connector.get_name()}\n"
-            self.usd_rate = float(self.rates["USD"])
-            for amount in self.amounts:
-                adjusted_amount = amount / self.usd_rate
-                absolute_amount = int(
-                    adjusted_amount * (10 ** int(self.token0["decimals"]))
+        # Amounts are standardized in USD, converted to token0 units
+        self.usd_rate = float(self.rates["USD"])
+
+        # Issue every connector/amount quote at once
+        jobs = [
+            (connector, amount, amount / self.usd_rate)
+            for connector in self.connectors
+            for amount in self.amounts
+        ]
+        quotes = self.quote_amounts(
+            [(connector, adjusted_amount) for connector, _, adjusted_amount in jobs]
+        )
+
+        report = LiquidityReport(self.token0, self.token1, self.base_rate)
+        for (connector, amount, adjusted_amount), quote in zip(jobs, quotes):
+            result = QuoteResult(connector.get_name(), adjusted_amount, amount)
+            if isinstance(quote, Exception):
+                result.error = str(quote)
+                result.error_kind = error_kind(quote)
+            else:
+                result.quote = quote
+                result.quote_rate = result.quote / adjusted_amount
+                result.comparison = (
+                    (result.quote_rate - self.base_rate) / self.base_rate
+                ) * 100
+            report.results.append(result)
+        return report
+
+    def depth_curve(
+        self, bands=DEPTH_BANDS, min_amount=10, max_amount=1_000_000, tolerance=0.05
+    ):
+        # For each connector and slippage band, searches the largest amount
+        # (in USD, between min_amount and max_amount) whose quote rate is
+        # within the band of the rate quoted for min_amount. Every band of
+        # every connector is bisected at once, on a log scale, one batch of
+        # quotes per round, until the amount is known within the tolerance.
+        self.usd_rate = float(self.rates["USD"])
+        curves = {
+            connector: DepthCurve(
+                connector.get_name(), self.token0, self.token1, self.base_rate
+            )
+            for connector in self.connectors
+        }
+        samples = {connector: {} for connector in self.connectors}  # USD -> rate
+
+        def sample(amounts_by_connector):
+            jobs = [
+                (connector, amount)
+                for connector, amounts in amounts_by_connector.items()
+                for amount in amounts
+            ]
+            quotes = self.quote_amounts(
+                [(connector, amount / self.usd_rate) for connector, amount in jobs]
+            )
+            for (connector, amount), quote in zip(jobs, quotes):
+                curves[connector].quotes += 1
+                samples[connector][amount] = (
+                    None
+                    if isinstance(quote, Exception)
+                    else quote / (amount / self.usd_rate)
                 )
-                try:
-                    quote = connector.get_quote(
-                        self.token0, self.token1, amount=absolute_amount, network="137"
+                if isinstance(quote, Exception) and amount == min_amount:
+                    curves[connector].error = str(quote)
+
+        def bracket(connector, band):
+            # Largest amount within the band below the smallest amount outside it
+            reference_rate = curves[connector].reference_rate
+            within, outside = [], []
+            for amount, rate in samples[connector].items():
+                slippage = (
+                    None
+                    if rate is None
+                    else (reference_rate - rate) / reference_rate * 100
+                )
+                if slippage is not None and slippage <= band:
+                    within.append(amount)
+                else:
+                    outside.append(amount)
+            high = min(outside, default=None)
+            low = max(
+                (amount for amount in within if high is None or amount < high),
+                default=None,
+            )
+            return low, high
+
+        sample({connector: [min_amount, max_amount] for connector in self.connectors})
+        for connector, curve in curves.items():
+            if curve.error is None:
+                curve.reference_rate = samples[connector][min_amount]
+
+        while True:
+            midpoints = {}
+            for connector, curve in curves.items():
+                if curve.error is not None:
+                    continue
+                for band in bands:
+                    low, high = bracket(connector, band)
+                    if low is not None and high is not None and high > low * (1 + tolerance):
+                        midpoints.setdefault(connector, set()).add((low * high) ** 0.5)
+            if not midpoints:
+                break
+            sample(midpoints)
+
+        for connector, curve in curves.items():
+            if curve.error is not None:
+                continue
+            for band in bands:
+                low, high = bracket(connector, band)
+                point = DepthPoint(band, bounded=high is not None)
+                if low is not None:
+                    point.amount_usd = low
+                    point.amount = low / self.usd_rate
+                    point.quote_rate = samples[connector][low]
+                curve.points.append(point)
+        return list(curves.values())
+
+
+def leg_key(route, depth, amount):
+    return (registry.pair_id(route[depth], route[depth + 1]), amount)
+
+
+@dataclass
+class RouteResult:
+    route: list
+    initial_amount: float  # in units of the route's first token
+    output_amount: float = 0
+    profit: float = None  # in %
+    error: str = None
+
+    def route_str(self):
+        return "-".join(token.symbol for token in self.route)
+
+    def __str__(self):
+        if self.error is not None:
+            return f"No quote for route {self.route_str()}: {self.error}"
+        if self.profit > 0:
+            return "\n".join(
+                (
+                    f"🔥🔥🔥 Arbitrage opportunity for {self.route[0].symbol}: {self.profit}%",
+                    f"Route: {self.route_str()}",
+                    f"Input amount: {self.initial_amount}",
+                    f"Output amount: {self.output_amount}",
+                )
+            )
+        return f"No arbitrage opportunity for route {self.route_str()}: {self.profit}%"
+
+
+class RouteEvaluator:
+    """
+    Evaluates arbitrage routes one depth level at a time: the legs of every
+    route at the same depth are quoted as one concurrent batch, and identical
+    (token_in, token_out, amount) legs are quoted only once per scan.
+    """
+
+    def __init__(self, connector, engine=None):
+        self.connector = connector
+        self.engine = engine or quoting_engine
+
+    def evaluate(self, routes):
+        leg_quotes = {}  # memoized leg quotes for this scan
+        amounts = [
+            int(route[0].default_amount * route[0].scale)
+            for route in routes
+        ]
+        errors = [None] * len(routes)
+
+        for depth in range(max(len(route) for route in routes) - 1):
+            # Legs of the routes still alive at this depth
+            alive = [
+                i
+                for i, route in enumerate(routes)
+                if errors[i] is None and depth < len(route) - 1
+            ]
+            legs = {leg_key(routes[i], depth, amounts[i]): i for i in alive}
+            missing = [leg for leg in legs if leg not in leg_quotes]
+            quotes = self.engine.quote_many(
+                [
+                    (
+                        self.connector,
+                        routes[legs[leg]][depth],
+                        routes[legs[leg]][depth + 1],
+                        leg[1],
                     )
-                    adjusted_quote = int(quote) / (10 ** int(self.token1["decimals"]))
-                    quote_rate = adjusted_quote / adjusted_amount
-                    comparison = ((quote_rate - self.base_rate) / self.base_rate) * 100
-                    if abs(comparison) > 1:
-                        report += f"🔴 -> {adjusted_amount} {self.token0['symbol']} = {adjusted_quote:.6f} {self.token1['symbol']}, Quote Rate: {quote_rate:.3f}, Vs Base Rate: {comparison:.3f}%\n"
-                    else:
-                        report += f"🟢 -> {adjusted_amount} {self.token0['symbol']} = {adjusted_quote:.3f} {self.token1['symbol']}, Quote Rate: {quote_rate:.3f}, Vs Base Rate: {comparison:.3f}%\n"
-                except ValueError as e:
-                    report += f"Not enough liquidity for {adjusted_amount} {self.token0['symbol']}. Error: {str(e)}\n"
-        report += "Done!\n"
-        return report
+                    for leg in missing
+                ],
+                network="137",
+            )
+            leg_quotes.update(zip(missing, quotes))
 
+            for i in alive:
+                route = routes[i]
+                quote = leg_quotes[leg_key(route, depth, amounts[i])]
+                if isinstance(quote, Exception):
+                    errors[i] = str(quote)
+                else:
+                    amounts[i] = int(quote)
 
-# Defining connector
-connector = ParaswapConnector()
-
-# Initialize the total number of routes to check
-total_routes = len(arbitrage_routes)
-
-# Initialize the iteration count
-iteration = 0
-
-# Initialize a list to store results
-results = []
-
-# ANSI escape codes for colors
-GREEN = "\033[92m"
-YELLOW = "\033[93m"
-RED = "\033[91m"
-RESET = "\033[0m"
-
-# Print the header
-print(f"{YELLOW}==========================================")
-print(f"{GREEN}  _____                     _               ")
-print(f"{GREEN} |_   _|                   (_)              ")
-print(f"{GREEN}   | |  _ __ __ _ _ __ ___  _ _ __   __ _  ")
-print(f"{GREEN}   | | | '__/ _` | '_ ` _ \\| | '_ \\ / _` | ")
-print(f"{GREEN}  _| |_| | | (_| | | | | | | | | | | (_| | ")
-print(f"{GREEN} |_____|_|  \\__,_|_| |_| |_|_|_| |_|\\__, | ")
-print(f"{GREEN}                                     __/ | ")
-print(f"{GREEN}                                    |___/  ")
-print(f"{YELLOW}=========================================={RESET}\n")
-print(f"{RED}Checking arbitrage opportunities...{RESET}\n")
-
-# # For each route, calculate the arbitrage opportunity
-# for route in arbitrage_routes:
-#     iteration += 1
-#     token0 = route[0]
-#     initial_amount = token0["default_amount"]  # Initial amount for token1
-#     output_amount = 0  # Output amount for the route after execution
-#     # display_progress_bar(iteration, total_routes)
-#     for i in range(len(route) - 1):
-#         token_in = route[i]
-#         token_out = route[i + 1]
-#         # Get the quote for the route
-#         if output_amount != 0:
-#             try:
-#                 # print("Checking liquidity for", token_in["symbol"], token_out["symbol"])
-#                 output_amount = connector.get_quote(token_in, token_out, output_amount)
-#                 print(output_amount)
-#             except ValueError:
-#                 # print(f"Not enough liquidity for {output_amount} {token_in['symbol']}")
-#                 output_amount = 0
-#                 break
-#         else:
-#             decimals_initial_amount = int(
-#                 initial_amount * (10 ** int(token_in["decimals"]))
-#             )
-#             try:
-#                 # print("Checking liquidity for", token_in["symbol"], token_out["symbol"])
-#                 output_amount = connector.get_quote(
-#                     token_in, token_out, decimals_initial_amount
-#                 )
-#                 print(output_amount)
-#             except ValueError:
-#                 # print(f"Not enough liquidity for {initial_amount} {token_in['symbol']}")
-#                 break
-
-#     # Calculate the arbitrage opportunity
-#     # print("initial_amount", initial_amount)
-#     adjusted_output_amount = float(output_amount) * (10 ** (-token0["decimals"]))
-#     # print("output_amount", adjusted_output_amount)
-#     arbitrage_opportunity = (
-#         (adjusted_output_amount - initial_amount) / initial_amount * 100
-#     )
-
-#     route_str = ""
-#     for token in route:
-#         route_str += token["symbol"] + "-"
-#     # print(route_str)
-#     # Print the results
-#     # Store the results instead of printing them immediately
-#     if arbitrage_opportunity > 0:
-#         result = (
-#             f"🔥🔥🔥 Arbitrage opportunity for {token0['symbol']}: {arbitrage_opportunity}%",
-#             f"Route: {route_str}",
-#             f"Input amount: {initial_amount}",
-#             f"Output amount: {adjusted_output_amount}",
-#         )
-#     else:
-#         result = (
-#             f"No arbitrage opportunity for route {route_str}: {arbitrage_opportunity}%"
-#         )
-
-#     results.append(result)
-
-# print("\nDone!")
-
-def get_token_input():
-    # print("Select a token:")
-    print("BRLA: BRLA Token")
-    print("USDC: USD Coin (POS)")
-    # print("BRZ_OLD: BRZ Token (old)")
-    print("BRZ: BRZ Token")
-    print("WETH: Wrapped Ether")
-    token_choice = input("Enter the number of your choice: ")
-    return tokens[token_choice]
-
-
-def get_base_rate_input():
-    base_rate = input("👉 Enter the base rate (or 'latest' to use the latest quote): ")
-    if base_rate.lower() == "latest":
-        return 0
-    else:
-        return float(base_rate)
+        results = []
+        for route, amount, error in zip(routes, amounts, errors):
+            result = RouteResult(route, route[0].default_amount, error=error)
+            if error is None:
+                result.output_amount = amount / route[0].scale
+                result.profit = (
+                    (result.output_amount - result.initial_amount)
+                    / result.initial_amount
+                    * 100
+                )
+            results.append(result)
+        # Most profitable routes first, unquotable routes last
+        return sorted(
+            results,
+            key=lambda result: result.profit if result.error is None else float("-inf"),
+            reverse=True,
+        )
+
+
+class NegativeCycleScanner:
+    """
+    Finds arbitrage candidates from one quote per directed token pair: the
+    rates go into a matrix of -log(rate) weights, where a profitable cycle is
+    a negative cycle, found with a vectorized Floyd-Warshall pass. Only the
+    candidate cycles are then confirmed with full-size sequential quotes.
+    """
 
+    def __init__(self, connector, tokens, engine=None, min_profit=0, liquid_pairs=None):
+        self.connector = connector
+        self.tokens = tokens
+        self.keys = list(tokens)
+        self.engine = engine or quoting_engine
+        self.min_profit = min_profit  # in %, for a cycle to be a candidate
+        self.graph = build_token_graph(tokens, liquid_pairs)
+        self.unquoted = []  # (token0, token1, error) of the last quote_rates
 
-while True:
-    # Get user input for the first token
-    print("👉 Select the first token:")
-    token0 = get_token_input()
+    def quote_rates(self):
+        import numpy as np
 
-    print("\n----------------------------------\n")
+        # rates[i, j] is how many token j one token i buys, 0 if unquotable
+        pairs = [
+            (i, self.keys.index(key1))
+            for i, key0 in enumerate(self.keys)
+            for key1 in self.graph[key0]
+        ]
+        jobs = []
+        for i, j in pairs:
+            token0, token1 = self.tokens[self.keys[i]], self.tokens[self.keys[j]]
+            amount = int(token0.default_amount * token0.scale)
+            jobs.append((self.connector, token0, token1, amount))
+        quotes = self.engine.quote_many(jobs, network="137")
 
-    # Get user input for the second token
-    print("👉 Select the second token:")
-    token1 = get_token_input()
+        rates = np.zeros((len(self.keys), len(self.keys)))
+        self.unquoted = []
+        for (i, j), (_, token0, token1, amount), quote in zip(pairs, jobs, quotes):
+            if isinstance(quote, Exception):
+                self.unquoted.append((token0, token1, quote))
+            else:
+                rates[i, j] = (int(quote) / token1.scale) / (amount / token0.scale)
 
-    print("\n----------------------------------\n")
+        # Unquoted pairs are missing edges, so cycles through them can't be found
+        if self.unquoted:
+            print(
+                f"Could not quote {len(self.unquoted)} of {len(pairs)} pairs: "
+                + ", ".join(
+                    f"{token0.symbol}-{token1.symbol} ({error_kind(error)})"
+                    for token0, token1, error in self.unquoted
+                )
+            )
+        return rates
 
-    # Get user input for the base rate
-    base_rate = get_base_rate_input()
+    def find_cycles(self, rates):
+        import numpy as np
 
-    print("\n----------------------------------\n")
+        n = len(rates)
+        with np.errstate(divide="ignore"):
+            dist = np.where(rates > 0, -np.log(rates), np.inf)
+        # next_hop[i, j] is the first hop on the best known path from i to j
+        next_hop = np.tile(np.arange(n), (n, 1))
+        for k in range(n):
+            via_k = dist[:, k : k + 1] + dist[k : k + 1, :]
+            better = via_k < dist - 1e-12
+            dist = np.where(better, via_k, dist)
+            next_hop = np.where(better, next_hop[:, k : k + 1], next_hop)
 
-    # Instantiate the LiquidityCalculator
-    calculator = LiquidityCalculator([connector], token0, token1, base_rate)
+        threshold = -np.log1p(self.min_profit / 100)
+        cycles = {}
+        for start in np.flatnonzero(np.diag(dist) < min(threshold, -1e-12)):
+            # Follow the next hops from start until a token repeats
+            path = [int(start)]
+            node = int(next_hop[start, start])
+            while node not in path:
+                path.append(node)
+                node = int(next_hop[node, start])
+            cycle = path[path.index(node) :]
+            # Rotate the cycle to its first token, so rotations collapse
+            first = cycle.index(min(cycle))
+            cycle = tuple(cycle[first:] + cycle[:first])
+            if len(cycle) >= 2:
+                cycles[cycle] = float(
+                    np.prod([rates[a, b] for a, b in zip(cycle, cycle[1:] + cycle[:1])])
+                )
 
-    # Print the liquidity check
-    print(calculator.check_liquidity())
+        return [
+            [self.tokens[self.keys[i]] for i in cycle + cycle[:1]]
+            for cycle, product in sorted(cycles.items(), key=lambda item: -item[1])
+            if product > 1 + self.min_profit / 100
+        ]
 
-    # Ask the user if they want to end the script or run another pair
-    continue_choice = input("👉 Run another pair or end? (run/end): ")
-    if continue_choice.lower() == "end":
-        break
+    def scan(self):
+        candidates = self.find_cycles(self.quote_rates())
+        if not candidates:
+            return []
+        # Confirm the candidates with full-size quotes along each route
+        return RouteEvaluator(self.connector, self.engine).evaluate(candidates)
 
-# # Instantiate the ArbitrageCalculator for USD to BRL
-# usd_brl_calculator = LiquidityCalculator([connector], usdc_token, brla_token)
-# print(usd_brl_calculator.check_liquidity())
 
-# # Instantiate the ArbitrageCalculator for BRL to USD
-# brl_usd_calculator = LiquidityCalculator([connector], brla_token, usdc_token)
-# print(brl_usd_calculator.check_liquidity())
+class LiquidityMonitor:
+    """
+    Checks the liquidity of every pair, in both directions, on a fixed
+    interval and appends the quotes to a QuoteStore, so liquidity can be
+    tracked over time without anyone at the keyboard.
+    """
 
-# # Instantiate the ArbitrageCalculator for USD to BRZ (old)
-# usd_brz_calculator = LiquidityCalculator([connector], usdc_token, brz_token_old)
-# print(usd_brz_calculator.check_liquidity())
+    def __init__(self, connectors, pairs, store, interval=300, window=86400):
+        self.connectors = connectors
+        self.pairs = pairs
+        self.store = store
+        self.interval = interval  # seconds between sweeps
+        self.window = window  # seconds covered by the rolling aggregates
 
-# # Instantiate the ArbitrageCalculator for BRZ (old) to USD
-# brz_usd_calculator = LiquidityCalculator([connector], brz_token_old, usdc_token)
-# print(brz_usd_calculator.check_liquidity())
+    def sweep(self):
+        timestamp = int(time.time())
+        for token0, token1 in self.pairs:
+            for input_token, output_token in ((token0, token1), (token1, token0)):
+                try:
+                    calculator = LiquidityCalculator(
+                        self.connectors, input_token, output_token
+                    )
+                    self.store.append(timestamp, calculator.check_liquidity())
+                except Exception as e:
+                    print(
+                        f"Error occurred checking {input_token.symbol}-{output_token.symbol}: {e}"
+                    )
 
-# # # Instantiate the ArbitrageCalculator for USD to BRZ (old)
-# usd_brz_calculator = LiquidityCalculator([connector], usdc_token, brz_token)
-# print(usd_brz_calculator.check_liquidity())
+    def summary(self):
+        since = int(time.time()) - self.window
+        report = ""
+        for token0, token1 in self.pairs:
+            for input_token, output_token in ((token0, token1), (token1, token0)):
+                pair = f"{input_token.symbol}-{output_token.symbol}"
+                for row in self.store.rolling(
+                    input_token.symbol, output_token.symbol, since
+                ):
+                    if row["avg_comparison"] is None:
+                        report += f"{pair} {row['connector']} ${row['amount_usd']:,.0f}: no quotes, {row['checks']} checks\n"
+                        continue
+                    report += f"{pair} {row['connector']} ${row['amount_usd']:,.0f}: Avg Vs Base Rate: {row['avg_comparison']:.3f}%, Max Deviation: {row['max_deviation']:.3f}%, Errors: {row['error_rate']:.0%}, {row['checks']} checks\n"
+        return report
 
-# # Instantiate the ArbitrageCalculator for BRZ (old) to USD
-# brz_usd_calculator = LiquidityCalculator([connector], brz_token, usdc_token)
-# print(brz_usd_calculator.check_liquidity())
+    def run(self):
+        while True:
+            started_at = time.time()
+            self.sweep()
+            print(self.summary())
+            for connector in self.connectors:
+                if isinstance(connector, CachedQuoteConnector):
+                    print(f"Quote cache stats: {connector.stats()}")
+            time.sleep(max(0, self.interval - (time.time() - started_at)))
@@ -0,0 +1,188 @@
+import json
+import argparse
+from quote_store import QuoteStore
+from quoter import (
+    CachedQuoteConnector,
+    LiquidityCalculator,
+    LiquidityMonitor,
+    NegativeCycleScanner,
+    ParaswapConnector,
+    RouteEvaluator,
+    LIQUIDITY_MONITOR_INTERVAL,
+    LIQUIDITY_STORE_PATH,
+    get_arbitrage_routes,
+    pairs,
+    tokens,
+)
+
+# ANSI escape codes for colors
+GREEN = "\033[92m"
+YELLOW = "\033[93m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+
+def print_header():
+    print(f"{YELLOW}==========================================")
+    print(f"{GREEN}  _____                     _               ")
+    print(f"{GREEN} |_   _|                   (_)              ")
+    print(f"{GREEN}   | |  _ __ __ _ _ __ ___  _ _ __   __ _  ")
+    print(f"{GREEN}   | | | '__/ _` | '_ ` _ \\| | '_ \\ / _` | ")
+    print(f"{GREEN}  _| |_| | | (_| | | | | | | | | | | (_| | ")
+    print(f"{GREEN} |_____|_|  \\__,_|_| |_| |_|_|_| |_|\\__, | ")
+    print(f"{GREEN}                                     __/ | ")
+    print(f"{GREEN}                                    |___/  ")
+    print(f"{YELLOW}=========================================={RESET}\n")
+    print(f"{RED}Checking arbitrage opportunities...{RESET}\n")
+
+
+def get_token_input():
+    # Every quoted token of the registry
+    for key, token in tokens.items():
+        print(f"{key}: {token.name}")
+    while True:
+        token_choice = input("Enter the token of your choice: ").strip()
+        if token_choice in tokens:
+            return tokens[token_choice]
+        print(f"Unknown token: {token_choice}")
+
+
+def get_base_rate_input():
+    base_rate = input("👉 Enter the base rate (or 'latest' to use the latest quote): ")
+    if base_rate.lower() == "latest":
+        return 0
+    else:
+        return float(base_rate)
+
+
+def arbitrage(connector):
+    print_header()
+
+    # For each route, calculate the arbitrage opportunity
+    for result in RouteEvaluator(connector).evaluate(get_arbitrage_routes()):
+        print(result)
+
+    print("\nDone!")
+
+
+def scan(connector):
+    print_header()
+
+    # Quote every pair once, and confirm only the profitable cycles
+    results = NegativeCycleScanner(connector, tokens).scan()
+    for result in results:
+        print(result)
+    if not results:
+        print("No arbitrage cycle found.")
+
+    print("\nDone!")
+
+
+def depth(connector, output=None):
+    # Depth curve of every pair, in both directions
+    curves = []
+    for token0, token1 in pairs:
+        for token_in, token_out in ((token0, token1), (token1, token0)):
+            calculator = LiquidityCalculator([connector], token_in, token_out)
+            for curve in calculator.depth_curve():
+                print(curve)
+                curves.append(curve.to_dict())
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(curves, f, indent=2)
+        print(f"Depth curves written to {output}")
+
+
+def interactive(connector):
+    print_header()
+
+    while True:
+        # Get user input for the first token
+        print("👉 Select the first token:")
+        token0 = get_token_input()
+
+        print("\n----------------------------------\n")
+
+        # Get user input for the second token
+        print("👉 Select the second token:")
+        token1 = get_token_input()
+
+        print("\n----------------------------------\n")
+
+        # Get user input for the base rate
+        base_rate = get_base_rate_input()
+
+        print("\n----------------------------------\n")
+
+        # Instantiate the LiquidityCalculator
+        calculator = LiquidityCalculator([connector], token0, token1, base_rate)
+
+        # Print the liquidity check
+        print(calculator.check_liquidity())
+        print(f"Quote cache stats: {connector.stats()}")
+
+        # Ask the user if they want to end the script or run another pair
+        continue_choice = input("👉 Run another pair or end? (run/end): ")
+        if continue_choice.lower() == "end":
+            break
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the liquidity of the quoted token pairs."
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--monitor",
+        action="store_true",
+        help="Run headless, sweeping every pair on an interval.",
+    )
+    mode.add_argument(
+        "--arbitrage",
+        action="store_true",
+        help="Evaluate every arbitrage route between the quoted tokens.",
+    )
+    mode.add_argument(
+        "--scan",
+        action="store_true",
+        help="Find arbitrage cycles from one quote per token pair.",
+    )
+    mode.add_argument(
+        "--depth",
+        action="store_true",
+        help="Print the depth curve of every pair.",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="PATH",
+        help="With --depth, also write the depth curves to a JSON file.",
+    )
+    args = parser.parse_args()
+
+    # Defining connector
+    connector = CachedQuoteConnector(ParaswapConnector())
+
+    if args.monitor:
+        monitor = LiquidityMonitor(
+            [connector],
+            pairs,
+            QuoteStore(LIQUIDITY_STORE_PATH),
+            LIQUIDITY_MONITOR_INTERVAL,
+        )
+        monitor.run()
+    elif args.arbitrage:
+        arbitrage(connector)
+        print(f"Quote cache stats: {connector.stats()}")
+    elif args.scan:
+        scan(connector)
+        print(f"Quote cache stats: {connector.stats()}")
+    elif args.depth:
+        depth(connector, args.output)
+        print(f"Quote cache stats: {connector.stats()}")
+    else:
+        interactive(connector)
+
+
+if __name__ == "__main__":
+    main()
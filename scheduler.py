@@ -0,0 +1,133 @@
+import pytz
+from datetime import datetime, timedelta
+from json_state import load_json_state, save_json_state
+
+# How many delivered slots are remembered in the state file
+DELIVERED_HISTORY = 50
+
+
+class DailySchedule:
+    """
+    Daily wall-clock slots in a timezone, with their deliveries persisted to
+    disk so each slot is delivered at most once, even across restarts.
+    """
+
+    def __init__(self, times, timezone, state_path, catch_up_grace=0):
+        """
+        Args:
+            times (list): The (hour, minute) of each daily slot.
+            timezone (str): The timezone the slots are expressed in.
+            state_path (str): The JSON file the delivered slots are persisted to.
+            catch_up_grace (int, optional): How long after a slot it is still delivered if it was missed, in seconds. Defaults to 0.
+        """
+
+        self.times = sorted(times)
+        self.timezone = pytz.timezone(timezone)
+        self.state_path = state_path
+        self.catch_up_grace = timedelta(seconds=catch_up_grace)
+        self.delivered = self.load_state()
+
+    def load_state(self):
+        """
+        Load the delivered slots from the state file.
+
+        Returns:
+            list: The keys of the delivered slots, oldest first.
+        """
+
+        return load_json_state(self.state_path, {}).get("delivered", [])
+
+    def save_state(self):
+        """
+        Persist the delivered slots to the state file.
+        """
+
+        save_json_state(
+            self.state_path, {"delivered": self.delivered[-DELIVERED_HISTORY:]}
+        )
+
+    @staticmethod
+    def slot_key(slot):
+        """
+        Get the key a slot is persisted under.
+
+        Args:
+            slot (datetime): The slot.
+
+        Returns:
+            str: The slot as an ISO 8601 string.
+        """
+
+        return slot.isoformat()
+
+    def slots_around(self, now):
+        """
+        Get the slots from the day before to the day after `now`.
+
+        Args:
+            now (datetime): An aware datetime.
+
+        Returns:
+            list: The slots as aware datetimes, in chronological order.
+        """
+
+        today = now.astimezone(self.timezone).date()
+        slots = []
+        for day_offset in (-1, 0, 1):
+            day = today + timedelta(days=day_offset)
+            for hour, minute in self.times:
+                naive = datetime(day.year, day.month, day.day, hour, minute)
+                slots.append(self.timezone.localize(naive))
+        return slots
+
+    def next_slot(self, now=None):
+        """
+        Get the next slot to deliver.
+
+        This is the earliest undelivered slot that either is still ahead or
+        was missed less than `catch_up_grace` ago.
+
+        Args:
+            now (datetime, optional): An aware datetime. Defaults to the current time.
+
+        Returns:
+            datetime: The slot, as an aware datetime.
+        """
+
+        now = now or datetime.now(self.timezone)
+        for slot in self.slots_around(now):
+            if slot + self.catch_up_grace >= now and not self.is_delivered(slot):
+                return slot
+
+    def is_delivered(self, slot):
+        """
+        Check whether a slot was already delivered.
+
+        Args:
+            slot (datetime): The slot.
+
+        Returns:
+            bool: Whether the slot was delivered.
+        """
+
+        return self.slot_key(slot) in self.delivered
+
+    def claim(self, slot):
+        """
+        Record a slot as delivered, unless it already was.
+
+        The claim is persisted before the delivery happens, so a crash while
+        delivering can never lead to a second delivery of the same slot.
+
+        Args:
+            slot (datetime): The slot about to be delivered.
+
+        Returns:
+            bool: Whether the caller should deliver the slot.
+        """
+
+        if self.is_delivered(slot):
+            return False
+        self.delivered.append(self.slot_key(slot))
+        self.save_state()
+        return True
@@ -0,0 +1,162 @@
+import json
+
+# Tokens known to the quoter and the bot
+TOKENS_PATH = "lib/tokens.json"
+
+
+class Token:
+    """
+    A token, with the constants derived from it computed once.
+    """
+
+    __slots__ = (
+        "id",
+        "key",
+        "symbol",
+        "name",
+        "address",
+        "currency",
+        "decimals",
+        "scale",
+        "default_amount",
+        "usd_value",
+        "quoted",
+        "aliases",
+    )
+
+    def __init__(
+        self,
+        id,
+        key,
+        symbol,
+        name,
+        address,
+        currency,
+        decimals,
+        default_amount=None,
+        usd_value=None,
+        quoted=False,
+        aliases=(),
+    ):
+        """
+        Args:
+            id (int): The index of the token in its registry.
+            key (str): The unique key of the token in its registry.
+            symbol (str): The token symbol.
+            name (str): The token name.
+            address (str): The token contract address.
+            currency (str): The fiat or crypto currency the token tracks.
+            decimals (int): The token decimals.
+            default_amount (float, optional): The amount arbitrage routes start with. Defaults to None.
+            usd_value (float, optional): The reference value of one token, in USD. Defaults to None.
+            quoted (bool, optional): Whether the quoter checks the token's pairs. Defaults to False.
+            aliases (list, optional): Other symbols the token is reported under, like USDCE. Defaults to no aliases.
+        """
+
+        self.id = id
+        self.key = key
+        self.symbol = symbol
+        self.name = name
+        self.address = address
+        self.currency = currency
+        self.decimals = int(decimals)
+        self.scale = 10**self.decimals
+        self.default_amount = default_amount
+        self.usd_value = usd_value
+        self.quoted = quoted
+        self.aliases = tuple(aliases)
+
+    def __repr__(self):
+        return f"Token({self.key})"
+
+
+class TokenRegistry:
+    """
+    The known tokens, by key, each with an integer id so a pair of tokens is
+    identified by a single integer.
+    """
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries (list): A dict of Token arguments (without the id) per token.
+        """
+
+        self.tokens = {}
+        for entry in entries:
+            token = Token(len(self.tokens), **entry)
+            if token.key in self.tokens:
+                raise Exception(f"Duplicate token key: {token.key}")
+            self.tokens[token.key] = token
+        self.by_symbol = {}
+        for token in self.tokens.values():
+            for symbol in (token.symbol, *token.aliases):
+                if symbol in self.by_symbol:
+                    raise Exception(f"Duplicate token symbol: {symbol}")
+                self.by_symbol[symbol] = token
+
+    @classmethod
+    def load(cls, path=TOKENS_PATH):
+        """
+        Load a registry from a JSON file holding a list of tokens.
+
+        Args:
+            path (str, optional): The path of the JSON file. Defaults to TOKENS_PATH.
+
+        Returns:
+            TokenRegistry: The registry.
+        """
+
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def __getitem__(self, key):
+        return self.tokens[key]
+
+    def __iter__(self):
+        return iter(self.tokens.values())
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def quoted(self):
+        """
+        Get the tokens checked by the quoter.
+
+        Returns:
+            dict: The tokens, by key.
+        """
+
+        return {key: token for key, token in self.tokens.items() if token.quoted}
+
+    def pair_id(self, token0, token1):
+        """
+        Get the integer id of an ordered pair of tokens.
+
+        Args:
+            token0 (Token): The input token.
+            token1 (Token): The output token.
+
+        Returns:
+            int: The pair id.
+        """
+
+        return token0.id * len(self.tokens) + token1.id
+
+    def usd_value(self, symbol):
+        """
+        Get the reference value of a token, in USD.
+
+        Args:
+            symbol (str): The token symbol, or one of its aliases.
+
+        Returns:
+            float: The value of one token, or None if the token has no reference value.
+        """
+
+        token = self.by_symbol.get(symbol)
+        return token.usd_value if token is not None else None
+
+
+# Registry shared by every user of this process
+registry = TokenRegistry.load()
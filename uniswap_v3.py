@@ -0,0 +1,300 @@
+from bisect import bisect_left, bisect_right
+
+# Exact integer port of the Uniswap V3 swap math (TickMath, SqrtPriceMath,
+# SwapMath and the tick bitmap walk), used to simulate swaps on a snapshot of
+# a concentrated liquidity pool without any RPC call. Quickswap V3 pools run
+# Algebra, which shares this math and bitmap layout.
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+
+Q96 = 1 << 96
+MAX_UINT256 = (1 << 256) - 1
+FEE_DENOMINATOR = 1_000_000  # fees are in hundredths of a bip
+
+
+class NotEnoughLiquidityError(ValueError):
+    # The pool runs out of liquidity before the whole amount is swapped
+    pass
+
+
+class OutsideSnapshotError(ValueError):
+    # The swap moves the price beyond the ticks known to the snapshot
+    pass
+
+
+# Magic factors of TickMath.getSqrtRatioAtTick, one per bit of the tick
+_TICK_FACTORS = [
+    (0x2, 0xFFF97272373D413259A46990580E213A),
+    (0x4, 0xFFF2E50F5F656932EF12357CF3C7FDCC),
+    (0x8, 0xFFE5CACA7E10E4E61C3624EAA0941CD0),
+    (0x10, 0xFFCB9843D60F6159C9DB58835C926644),
+    (0x20, 0xFF973B41FA98C081472E6896DFB254C0),
+    (0x40, 0xFF2EA16466C96A3843EC78B326B52861),
+    (0x80, 0xFE5DEE046A99A2A811C461F1969C3053),
+    (0x100, 0xFCBE86C7900A88AEDCFFC83B479AA3A4),
+    (0x200, 0xF987A7253AC413176F2B074CF7815E54),
+    (0x400, 0xF3392B0822B70005940C7A398E4B70F3),
+    (0x800, 0xE7159475A2C29B7443B29C7FA6E889D9),
+    (0x1000, 0xD097F3BDFD2022B8845AD8F792AA5825),
+    (0x2000, 0xA9F746462D870FDF8A65DC1F90E061E5),
+    (0x4000, 0x70D869A156D2A1B890BB3DF62BAF32F7),
+    (0x8000, 0x31BE135F97D08FD981231505542FCFA6),
+    (0x10000, 0x9AA508B5B7A84E1C677DE54F3E99BC9),
+    (0x20000, 0x5D6AF8DEDB81196699C329225EE604),
+    (0x40000, 0x2216E584F5FA1EA926041BEDFE98),
+    (0x80000, 0x48A170391F7DC42444E8FA2),
+]
+
+
+def div_rounding_up(a, b):
+    return -(-a // b)
+
+
+def mul_div_rounding_up(a, b, denominator):
+    return div_rounding_up(a * b, denominator)
+
+
+def get_sqrt_ratio_at_tick(tick):
+    """
+    Get sqrt(1.0001 ** tick) as a Q64.96 number, rounded as TickMath does.
+    """
+
+    abs_tick = abs(tick)
+    if abs_tick > MAX_TICK:
+        raise ValueError(f"Tick out of range: {tick}")
+    if abs_tick & 0x1:
+        ratio = 0xFFFCB933BD6FAD37AA2D162D1A594001
+    else:
+        ratio = 0x100000000000000000000000000000000
+    for bit, factor in _TICK_FACTORS:
+        if abs_tick & bit:
+            ratio = (ratio * factor) >> 128
+    if tick > 0:
+        ratio = MAX_UINT256 // ratio
+    return (ratio >> 32) + (0 if ratio % (1 << 32) == 0 else 1)
+
+
+def get_tick_at_sqrt_ratio(sqrt_price_x96):
+    """
+    Get the greatest tick whose sqrt ratio is at most `sqrt_price_x96`.
+    """
+
+    if not MIN_SQRT_RATIO <= sqrt_price_x96 < MAX_SQRT_RATIO:
+        raise ValueError(f"Sqrt price out of range: {sqrt_price_x96}")
+    low, high = MIN_TICK, MAX_TICK
+    while low < high:
+        middle = (low + high + 1) // 2
+        if get_sqrt_ratio_at_tick(middle) <= sqrt_price_x96:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def get_amount0_delta(sqrt_a, sqrt_b, liquidity, round_up):
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    numerator1 = liquidity << 96
+    numerator2 = sqrt_b - sqrt_a
+    if round_up:
+        return div_rounding_up(
+            mul_div_rounding_up(numerator1, numerator2, sqrt_b), sqrt_a
+        )
+    return (numerator1 * numerator2 // sqrt_b) // sqrt_a
+
+
+def get_amount1_delta(sqrt_a, sqrt_b, liquidity, round_up):
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    if round_up:
+        return mul_div_rounding_up(liquidity, sqrt_b - sqrt_a, Q96)
+    return liquidity * (sqrt_b - sqrt_a) // Q96
+
+
+def get_next_sqrt_price_from_input(sqrt_price, liquidity, amount_in, zero_for_one):
+    if amount_in == 0:
+        return sqrt_price
+    if zero_for_one:
+        # Rounds up, falling back to the overflow-safe form like the contract
+        numerator1 = liquidity << 96
+        product = amount_in * sqrt_price
+        denominator = numerator1 + product
+        if product <= MAX_UINT256 and denominator <= MAX_UINT256:
+            return mul_div_rounding_up(numerator1, sqrt_price, denominator)
+        return div_rounding_up(numerator1, numerator1 // sqrt_price + amount_in)
+    # Rounds down
+    return sqrt_price + (amount_in << 96) // liquidity
+
+
+def compute_swap_step(sqrt_current, sqrt_target, liquidity, amount_remaining, fee):
+    """
+    Swap an exact input within one price range, like SwapMath.computeSwapStep.
+
+    Returns:
+        tuple: The next sqrt price, the amount in, the amount out and the fee amount.
+    """
+
+    zero_for_one = sqrt_current >= sqrt_target
+    amount_remaining_less_fee = (
+        amount_remaining * (FEE_DENOMINATOR - fee) // FEE_DENOMINATOR
+    )
+    if zero_for_one:
+        amount_in = get_amount0_delta(sqrt_target, sqrt_current, liquidity, True)
+    else:
+        amount_in = get_amount1_delta(sqrt_current, sqrt_target, liquidity, True)
+    if amount_remaining_less_fee >= amount_in:
+        sqrt_next = sqrt_target
+    else:
+        sqrt_next = get_next_sqrt_price_from_input(
+            sqrt_current, liquidity, amount_remaining_less_fee, zero_for_one
+        )
+
+    reached_target = sqrt_next == sqrt_target
+    if zero_for_one:
+        if not reached_target:
+            amount_in = get_amount0_delta(sqrt_next, sqrt_current, liquidity, True)
+        amount_out = get_amount1_delta(sqrt_next, sqrt_current, liquidity, False)
+    else:
+        if not reached_target:
+            amount_in = get_amount1_delta(sqrt_current, sqrt_next, liquidity, True)
+        amount_out = get_amount0_delta(sqrt_current, sqrt_next, liquidity, False)
+
+    if not reached_target:
+        fee_amount = amount_remaining - amount_in
+    else:
+        fee_amount = mul_div_rounding_up(amount_in, fee, FEE_DENOMINATOR - fee)
+    return sqrt_next, amount_in, amount_out, fee_amount
+
+
+class PoolState:
+    """
+    Snapshot of a concentrated liquidity pool at one block.
+
+    Only the ticks of the bitmap words in `word_range` are known, so a swap
+    moving the price beyond them can't be simulated and raises an
+    OutsideSnapshotError.
+    """
+
+    __slots__ = (
+        "sqrt_price_x96",
+        "tick",
+        "liquidity",
+        "fee",
+        "tick_spacing",
+        "liquidity_net",
+        "word_range",
+        "initialized",
+    )
+
+    def __init__(
+        self,
+        sqrt_price_x96,
+        tick,
+        liquidity,
+        fee,
+        tick_spacing,
+        liquidity_net,
+        word_range,
+    ):
+        """
+        Args:
+            sqrt_price_x96 (int): The current sqrt price, as a Q64.96 number.
+            tick (int): The current tick.
+            liquidity (int): The in-range liquidity.
+            fee (int): The swap fee, in hundredths of a bip.
+            tick_spacing (int): The spacing of the initializable ticks.
+            liquidity_net (dict): The net liquidity of each initialized tick.
+            word_range (tuple): The first and last bitmap word whose ticks are known.
+        """
+
+        self.sqrt_price_x96 = sqrt_price_x96
+        self.tick = tick
+        self.liquidity = liquidity
+        self.fee = fee
+        self.tick_spacing = tick_spacing
+        self.liquidity_net = liquidity_net
+        self.word_range = word_range
+        self.initialized = sorted(tick // tick_spacing for tick in liquidity_net)
+
+    def next_initialized_tick(self, tick, zero_for_one):
+        """
+        Find the next tick to step to within one bitmap word, like
+        TickBitmap.nextInitializedTickWithinOneWord.
+
+        Returns:
+            tuple: The next tick and whether it is initialized.
+        """
+
+        compressed = tick // self.tick_spacing  # rounds towards negative infinity
+        if not zero_for_one:
+            compressed += 1
+        word = compressed >> 8
+        if not self.word_range[0] <= word <= self.word_range[1]:
+            raise OutsideSnapshotError(
+                "Swap moves the price beyond the snapshotted ticks"
+            )
+
+        if zero_for_one:
+            # Closest initialized tick at or below, within the word
+            index = bisect_right(self.initialized, compressed) - 1
+            if index >= 0 and self.initialized[index] >= word << 8:
+                return self.initialized[index] * self.tick_spacing, True
+            return (word << 8) * self.tick_spacing, False
+
+        # Closest initialized tick above, within the word
+        index = bisect_left(self.initialized, compressed)
+        if index < len(self.initialized) and self.initialized[index] <= (word << 8) + 255:
+            return self.initialized[index] * self.tick_spacing, True
+        return ((word << 8) + 255) * self.tick_spacing, False
+
+    def quote_exact_input(self, amount_in, zero_for_one):
+        """
+        Simulate an exact input swap, like the pool's swap loop.
+
+        Args:
+            amount_in (int): The amount of the input token, in its smallest unit.
+            zero_for_one (bool): Whether token0 is swapped for token1.
+
+        Returns:
+            int: The amount of the output token, in its smallest unit.
+        """
+
+        sqrt_price = self.sqrt_price_x96
+        tick = self.tick
+        liquidity = self.liquidity
+        remaining = amount_in
+        amount_out = 0
+        limit = MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+
+        while remaining != 0 and sqrt_price != limit:
+            next_tick, initialized = self.next_initialized_tick(tick, zero_for_one)
+            next_tick = max(MIN_TICK, min(MAX_TICK, next_tick))
+            sqrt_next = get_sqrt_ratio_at_tick(next_tick)
+            if zero_for_one:
+                sqrt_target = max(sqrt_next, limit)
+            else:
+                sqrt_target = min(sqrt_next, limit)
+
+            sqrt_start = sqrt_price
+            sqrt_price, step_in, step_out, fee_amount = compute_swap_step(
+                sqrt_price, sqrt_target, liquidity, remaining, self.fee
+            )
+            remaining -= step_in + fee_amount
+            amount_out += step_out
+
+            if sqrt_price == sqrt_next:
+                if initialized:
+                    liquidity_net = self.liquidity_net[next_tick]
+                    liquidity += -liquidity_net if zero_for_one else liquidity_net
+                tick = next_tick - 1 if zero_for_one else next_tick
+            elif sqrt_price != sqrt_start:
+                tick = get_tick_at_sqrt_ratio(sqrt_price)
+
+        if remaining != 0:
+            raise NotEnoughLiquidityError(
+                "Not enough liquidity in the pool for this amount"
+            )
+        return amount_out